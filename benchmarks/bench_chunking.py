@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ragbot import chunking
+
+WORDS = (
+    "pizza dough tomato sauce mozzarella oven basil olive oil crust slice naples "
+    "margherita wood fired temperature flour yeast water salt bake minutes topping"
+).split()
+
+
+# Synthetic document delivered as pages, like the PDF extractor produces them
+def synthetic_pages(megabytes, page_chars=3000, seed=0):
+    rng = random.Random(seed)
+    remaining = int(megabytes * 1024 * 1024)
+    while remaining > 0:
+        sentences = []
+        length = 0
+        while length < page_chars:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))).capitalize() + "."
+            if rng.random() < 0.1:
+                sentence += "\n\n"
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        page = " ".join(sentences)
+        remaining -= len(page)
+        yield page
+
+
+def run(strategy, megabytes):
+    start = time.perf_counter()
+    chunks = 0
+    characters = 0
+    for chunk in chunking.chunk_stream(synthetic_pages(megabytes), strategy):
+        chunks += 1
+        characters += len(chunk)
+    elapsed = time.perf_counter() - start
+    print(f"{strategy:>6}: {chunks} chunks in {elapsed:.2f} s "
+          f"({chunks / elapsed:.0f} chunks/s, {characters / elapsed / 1024 / 1024:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure chunking throughput on a synthetic document.")
+    parser.add_argument("--megabytes", type=float, default=20)
+    parser.add_argument("--strategy", choices=sorted(chunking.CHUNKERS), action="append")
+    args = parser.parse_args()
+    for strategy in args.strategy or sorted(chunking.CHUNKERS):
+        run(strategy, args.megabytes)
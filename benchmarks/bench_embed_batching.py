@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from ragbot import embed_batcher, ollama_embed
+from bench_chunking import WORDS
+from mock_ollama import MockOllama
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+# `callers` concurrent tasks each embedding `requests` distinct texts, either one
+# HTTP call per text or through an EmbeddingBatcher
+async def run_callers(api_url, callers, requests, batched, window, max_batch):
+    latencies = []
+    async with httpx.AsyncClient(timeout=None) as client:
+        batcher = embed_batcher.EmbeddingBatcher(client, api_url, "mock", window=window, max_batch=max_batch)
+
+        async def caller(index):
+            for turn in range(requests):
+                text = f"{index} {turn} " + " ".join(WORDS[(index + turn) % len(WORDS):])
+                start = time.perf_counter()
+                if batched:
+                    await batcher.embed(text)
+                else:
+                    await ollama_embed.embed_texts_async(client, api_url, "mock", [text])
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller(index) for index in range(callers)))
+        elapsed = time.perf_counter() - start
+        await batcher.close()
+
+    report = {"seconds": elapsed, "embeddings_per_second": len(latencies) / elapsed,
+              "p50_ms": percentile(latencies, 0.50), "p95_ms": percentile(latencies, 0.95)}
+    if batched:
+        report["batcher"] = batcher.stats()
+    return report
+
+
+def run(args):
+    # Every text is new, so each one really goes to the (mock) model
+    ollama_embed.USE_EMBEDDING_CACHE = False
+    report = {"config": vars(args)}
+    for batched in (False, True):
+        mock = MockOllama(dim=args.embedding_dim, embed_latency=args.embed_latency,
+                          embed_item_latency=args.embed_item_latency, serial_embeds=True)
+        with mock:
+            result = asyncio.run(run_callers(mock.api_url, args.callers, args.requests, batched,
+                                             args.window, args.max_batch))
+        result["embed_calls"] = mock.requests.get("/api/embed", 0)
+        report["batched" if batched else "unbatched"] = result
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent embedding throughput with and without micro-batching.")
+    parser.add_argument("--callers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20, help="Embeddings per caller")
+    parser.add_argument("--embedding-dim", type=int, default=1024)
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Fixed cost of one embed call")
+    parser.add_argument("--embed-item-latency", type=float, default=0.001, help="Cost per embedded text")
+    parser.add_argument("--window", type=float, default=embed_batcher.EMBED_BATCH_WINDOW_SECONDS)
+    parser.add_argument("--max-batch", type=int, default=embed_batcher.EMBED_MAX_BATCH)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
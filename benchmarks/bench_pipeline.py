@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rich.console import Console
+
+from ragbot import answer_cache, conversation, ingest, ollama_embed
+from ragbot.app import DB_CONFIG, RagChat
+from bench_chunking import WORDS, synthetic_pages
+from mock_ollama import MockOllama
+
+# Backends that can run against the mock ("custom" rebuilds an Ollama model
+# with sudo on every ingest)
+BACKENDS = ("pgvector",)
+
+
+# Baseline for --conversation resend: every turn sends the whole history again as text
+class ResendHistory(conversation.Conversation):
+    def prompt(self, prompt):
+        if not self.turns:
+            return prompt
+        return f"Conversation so far:\n{conversation.transcript(self.turns)}\n\n{prompt}"
+
+    def update(self, user_input, answer, context):
+        self.turns.append((user_input, answer))
+        return False
+
+
+CONVERSATIONS = {
+    "none": lambda: None,
+    "context": conversation.Conversation,
+    "resend": ResendHistory,
+}
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+    return {"count": len(ordered), "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99),
+            "max_ms": ordered[-1] * 1000}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# Tables the benchmark empties before a pgvector run, so every run ingests from scratch
+PG_TABLES = ("embeddings", "ingest_manifest", "ingest_checkpoint")
+
+
+# The chat app pointed at the mock and at a throwaway embedded store, or at a
+# PostgreSQL database (with the vector extension) whose ragbot tables are emptied
+def load_app(backend, api_url, store_path, embedding_dim, store_backend="mmap", db_config=None):
+    chat = RagChat(backend, store_backend=store_backend, store_path=store_path, db_config=db_config or DB_CONFIG,
+                   api_url=api_url, embedding_dim=embedding_dim, console=Console(quiet=True))
+    chat.setup_database()
+    if store_backend == "pgvector":
+        with chat.store.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"TRUNCATE {', '.join(PG_TABLES)}")
+            conn.commit()
+    return chat
+
+
+# Write the synthetic corpus as text files and run each through process_file
+def run_ingest(chat, directory, files, megabytes):
+    results = []
+    ingest_chunks = ingest.ingest_chunks
+
+    def recording_ingest_chunks(*args, **kwargs):
+        stats = ingest_chunks(*args, **kwargs)
+        results.append(stats)
+        return stats
+
+    paths = []
+    for index in range(files):
+        path = os.path.join(directory, f"corpus_{index}.txt")
+        with open(path, "w") as f:
+            f.write("\n\n".join(synthetic_pages(megabytes / files, seed=index)))
+        paths.append(path)
+
+    ingest.ingest_chunks = recording_ingest_chunks
+    try:
+        start = time.perf_counter()
+        for path in paths:
+            chat.process_file(path)
+        elapsed = time.perf_counter() - start
+    finally:
+        ingest.ingest_chunks = ingest_chunks
+
+    chunks = sum(stats["stored"] for stats in results)
+    return {"files": files, "megabytes": megabytes, "chunks": chunks, "seconds": elapsed,
+            "chunks_per_second": chunks / elapsed if elapsed else 0.0}
+
+
+# Scripted sessions through the same ChatPipeline chat() uses, timing every stage
+async def run_sessions(chat, sessions, turns, question_pool=20, seed=0, use_answer_cache=False,
+                       conversation_mode="none"):
+    rng = random.Random(seed)
+    # Users keep asking from a small set of questions
+    questions = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))) + "?" for _ in range(question_pool)]
+    retrieval, ttft, generation_ttft, turn_latency = [], [], [], []
+    prefill_seconds, prefill_tokens, decode_seconds = [], [], []
+
+    def timed_search(embedding, query_text):
+        start = time.perf_counter()
+        try:
+            return chat.search_similar_text(embedding, query_text)
+        finally:
+            retrieval.append(time.perf_counter() - start)
+
+    for _ in range(sessions):
+        pipeline = chat.pipeline()
+        pipeline.search = timed_search
+        pipeline.answer_cache = answer_cache.get_default_cache() if use_answer_cache else None
+        session = CONVERSATIONS[conversation_mode]()
+        async with pipeline:
+            for _ in range(turns):
+                question = rng.choice(questions)
+                start = time.perf_counter()
+                first = []
+                on_token = lambda token: first or first.append(time.perf_counter() - start)
+                stats = {}
+                await pipeline.answer(question, on_token=on_token, stats=stats, conversation=session)
+                turn_latency.append(time.perf_counter() - start)
+                if first:
+                    ttft.append(first[0])
+                if "first_token_seconds" in stats:
+                    generation_ttft.append(stats["first_token_seconds"])
+                if "prompt_eval_seconds" in stats:
+                    prefill_seconds.append(stats["prompt_eval_seconds"])
+                    prefill_tokens.append(stats["prompt_tokens"])
+                    decode_seconds.append(stats["eval_seconds"])
+
+    report = {"sessions": sessions, "turns_per_session": turns, "conversation": conversation_mode,
+            "retrieval": percentiles(retrieval),
+            "time_to_first_token": percentiles(ttft), "generation_ttft": percentiles(generation_ttft),
+            "turn_latency": percentiles(turn_latency),
+            "prefill": percentiles(prefill_seconds), "decode": percentiles(decode_seconds),
+            "mean_prefill_tokens": sum(prefill_tokens) / len(prefill_tokens) if prefill_tokens else 0.0}
+    if use_answer_cache:
+        report["answer_cache"] = answer_cache.get_default_cache().stats()
+    return report
+
+
+def run(args):
+    # Measure the pipeline, not the on-disk embedding cache
+    ollama_embed.USE_EMBEDDING_CACHE = args.embedding_cache
+    mock = MockOllama(dim=args.embedding_dim, embed_latency=args.embed_latency,
+                      embed_item_latency=args.embed_item_latency, first_token_latency=args.first_token_latency,
+                      tokens_per_second=args.tokens_per_second, response_tokens=args.response_tokens,
+                      prefill_tokens_per_second=args.prefill_tokens_per_second)
+    with mock, tempfile.TemporaryDirectory() as directory:
+        db_config = dict(DB_CONFIG, host=args.db_host, port=args.db_port, dbname=args.db_name,
+                         user=args.db_user, password=args.db_password)
+        chat = load_app(args.backend, mock.api_url, os.path.join(directory, "store"), args.embedding_dim,
+                        store_backend=args.store, db_config=db_config)
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "store": args.store,
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "db_password")},
+            "ingest": run_ingest(chat, directory, args.files, args.megabytes),
+            "chat": asyncio.run(run_sessions(chat, args.sessions, args.turns, args.question_pool,
+                                              use_answer_cache=args.answer_cache,
+                                              conversation_mode=args.conversation)),
+        }
+        report["mock_requests"] = dict(mock.requests)
+        chat.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end ingest and chat benchmark against a mock Ollama.")
+    parser.add_argument("--backend", choices=BACKENDS, default="pgvector")
+    parser.add_argument("--store", choices=("mmap", "pgvector"), default="mmap",
+                        help="Vector store; pgvector empties the ragbot tables of --db-name, so use a scratch database")
+    parser.add_argument("--db-host", default=DB_CONFIG["host"], help="Host name or socket directory")
+    parser.add_argument("--db-port", type=int, default=DB_CONFIG["port"])
+    parser.add_argument("--db-name", default="chatbot_bench")
+    parser.add_argument("--db-user", default=DB_CONFIG["user"])
+    parser.add_argument("--db-password", default=DB_CONFIG["password"])
+    parser.add_argument("--embedding-dim", type=int, default=4096)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--megabytes", type=float, default=2)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--question-pool", type=int, default=20, help="Distinct questions the sessions draw from")
+    parser.add_argument("--embed-latency", type=float, default=0.005)
+    parser.add_argument("--embed-item-latency", type=float, default=0.0005)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000,
+                        help="Mock prompt evaluation rate (0 for a fixed first-token latency)")
+    parser.add_argument("--conversation", choices=tuple(CONVERSATIONS), default="none",
+                        help="none: stateless turns, context: carry Ollama's context, resend: resend history as text")
+    parser.add_argument("--embedding-cache", action="store_true", help="Serve repeated texts from the embedding cache")
+    parser.add_argument("--answer-cache", action="store_true", help="Answer repeated questions from the answer cache")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
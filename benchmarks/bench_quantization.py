@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ragbot.mmap_store import MMAP_STORE_DTYPE, MmapVectorStore
+
+
+# Normalized vectors scattered around a few hundred centres, like embeddings of related text
+def synthetic_vectors(rows, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_store(path, vectors, dtype, quantization, rescore_factor, batch_size=2048):
+    store = MmapVectorStore(path, vectors.shape[1], dtype=dtype,
+                            quantization=quantization, rescore_factor=rescore_factor)
+    store.setup()
+    if not store.stats()["rows"]:
+        for start in range(0, len(vectors), batch_size):
+            store.add([(str(start + i), vector, None, None, None) for i, vector in enumerate(vectors[start:start + batch_size])])
+    return store
+
+
+def run_queries(store, queries, k):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        rows = store.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append({text for text, _, _ in rows})
+    return results, latencies
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# Recall@k of each quantized first pass (against exact search) and its query latency
+def run(rows, dim, queries, k, factors, dtype=MMAP_STORE_DTYPE):
+    vectors = synthetic_vectors(rows, dim)
+    rng = np.random.default_rng(1)
+    query_vectors = vectors[rng.integers(0, rows, queries)] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        exact = build_store(os.path.join(directory, "exact"), vectors, dtype, None, 1)
+        truth, latencies = run_queries(exact, query_vectors, k)
+        report.append({"quantization": "none", "rescore_factor": None, "recall": 1.0,
+                       "p50_ms": statistics.median(latencies) * 1000,
+                       "p95_ms": percentile(latencies, 0.95) * 1000,
+                       "size_mb": exact.stats()["size_mb"]})
+
+        for quantization in ("int8", "binary"):
+            path = os.path.join(directory, quantization)
+            for factor in factors:
+                store = build_store(path, vectors, dtype, quantization, factor)
+                found, latencies = run_queries(store, query_vectors, k)
+                recall = sum(len(a & b) for a, b in zip(found, truth)) / (k * len(truth))
+                code_bytes = sum(os.path.getsize(os.path.join(path, name))
+                                 for name in ("codes.bin", "scales.bin", "norms.bin"))
+                report.append({"quantization": quantization, "rescore_factor": factor, "recall": recall,
+                               "p50_ms": statistics.median(latencies) * 1000,
+                               "p95_ms": percentile(latencies, 0.95) * 1000,
+                               "code_mb": code_bytes / 1024 / 1024})
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of quantized first-pass search.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, action="append")
+    parser.add_argument("--dtype", default=MMAP_STORE_DTYPE, choices=("float16", "float32"))
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.rows, args.dim, args.queries, args.k, args.rescore_factor or [2, 4, 8, 16], args.dtype)
+    print(f"{args.rows} x {args.dim} {args.dtype} vectors, {args.queries} queries, recall@{args.k}")
+    for entry in report:
+        factor = entry["rescore_factor"] or "-"
+        print(f"{entry['quantization']:>6}  rescore x{factor:<3}  recall {entry['recall']:.3f}  "
+              f"p50 {entry['p50_ms']:7.2f} ms  p95 {entry['p95_ms']:7.2f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
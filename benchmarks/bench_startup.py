@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Everything the chat loop needs before the first prompt
+STARTUP_MODULE = "ragbot.app"
+
+# Import-time budget for STARTUP_MODULE (cumulative, median of the runs)
+STARTUP_BUDGET_MS = 400
+
+# Heavy dependencies that must stay lazy: imported on first use, never at startup
+LAZY_MODULES = ("pandas", "PyPDF2", "pdfminer", "psycopg2", "pgvector", "http.server")
+
+
+# Run `python -X importtime -c "import <module>"` in a fresh interpreter and
+# return {module: (self_us, cumulative_us)} in import order
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def run(module, runs, top):
+    totals = []
+    for _ in range(runs):
+        times = import_times(module)
+        totals.append(times[module][1] / 1000)
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+    eager = sorted({name for name in times for lazy in LAZY_MODULES if name == lazy or name.startswith(lazy + ".")})
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "slowest": [{"module": name, "cumulative_ms": cumulative / 1000} for name, (_, cumulative) in slowest[1:top + 1]],
+        "eager_heavy_imports": eager,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the chatbot's import time against a budget.")
+    parser.add_argument("--module", default=STARTUP_MODULE)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.module, args.runs, args.top)
+    report["budget_ms"] = args.budget_ms
+    report["ok"] = report["median_ms"] <= args.budget_ms and not report["eager_heavy_imports"]
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import {report['module']}: median {report['median_ms']:.0f} ms, min {report['min_ms']:.0f} ms "
+              f"(budget {args.budget_ms:.0f} ms)")
+        for entry in report["slowest"]:
+            print(f"  {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+        if report["eager_heavy_imports"]:
+            print("Imported at startup but should be lazy: " + ", ".join(report["eager_heavy_imports"]))
+    sys.exit(0 if report["ok"] else 1)
@@ -0,0 +1,156 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+WORDS = "the a pizza oven dough is baked at high heat for about ninety seconds until the crust".split()
+
+
+# Unit vector derived from the text alone, so every run embeds a text the same way
+def deterministic_embedding(text, dim):
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload):
+        line = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        mock = self.server.mock
+        request = self._read_json()
+        path = self.path.rstrip("/")
+        mock.count(path)
+
+        if path == "/api/embeddings":
+            with mock.embed_slot:
+                time.sleep(mock.embed_latency)
+            self._send_json({"embedding": deterministic_embedding(request.get("prompt", ""), mock.dim)})
+        elif path == "/api/embed":
+            texts = request.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            with mock.embed_slot:
+                time.sleep(mock.embed_latency + mock.embed_item_latency * len(texts))
+            self._send_json({"model": request.get("model"),
+                             "embeddings": [deterministic_embedding(text, mock.dim) for text in texts]})
+        elif path == "/api/generate":
+            self._stream_generate(mock, request)
+        else:
+            self.send_error(404)
+
+    # NDJSON stream shaped like Ollama's: one fragment per token, then a "done" frame
+    def _stream_generate(self, mock, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        # Tokens in a passed context are already evaluated; only the new prompt is prefilled
+        context = list(request.get("context") or [])
+        prompt_tokens = len(request.get("prompt", "").split())
+        prefill_seconds = mock.first_token_latency
+        if mock.prefill_tokens_per_second:
+            prefill_seconds += prompt_tokens / mock.prefill_tokens_per_second
+        time.sleep(prefill_seconds)
+        start = time.perf_counter()
+        for index in range(mock.response_tokens):
+            if index:
+                time.sleep(1 / mock.tokens_per_second)
+            self._send_chunk({"model": request.get("model"), "response": WORDS[index % len(WORDS)] + " ",
+                              "done": False})
+        eval_ns = int((time.perf_counter() - start) * 1e9)
+        self._send_chunk({
+            "model": request.get("model"), "response": "", "done": True,
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prefill_seconds * 1e9),
+            "eval_count": mock.response_tokens, "eval_duration": eval_ns, "load_duration": 0,
+            "context": context + list(range(prompt_tokens + mock.response_tokens)),
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+
+# Local stand-in for the Ollama endpoints the chatbots use, with deterministic
+# embeddings and configurable latency and token rate. Runs in a daemon thread.
+# With serial_embeds, embed calls are processed one at a time like Ollama does;
+# prefill_tokens_per_second adds prompt evaluation time per new prompt word.
+class MockOllama:
+    def __init__(self, dim=4096, embed_latency=0.005, embed_item_latency=0.0005,
+                 first_token_latency=0.05, tokens_per_second=200, response_tokens=64, port=0,
+                 serial_embeds=False, prefill_tokens_per_second=None):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.embed_item_latency = embed_item_latency
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.requests = {}
+        self.embed_slot = threading.Lock() if serial_embeds else contextlib.nullcontext()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def api_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api"
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a mock Ollama API for benchmarks.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--first-token-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    mock = MockOllama(dim=args.dim, tokens_per_second=args.tokens_per_second,
+                      first_token_latency=args.first_token_latency, port=args.port)
+    print(f"Mock Ollama listening on {mock.api_url}")
+    mock.start()._thread.join()
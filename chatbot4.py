@@ -1,11 +1,9 @@
 import requests
 import json
 import os
-import pandas as pd
-from PyPDF2 import PdfReader
 from rich.console import Console
 from rich.prompt import Prompt
-from pdfminer.high_level import extract_text
+from ragbot import extractors, ollama_stream, transport
 
 # Constants
 OLLAMA_API_URL = "http://localhost:11434/api"
@@ -42,18 +40,17 @@ def extract_text_from_file(file_path):
     console.print(f"[bold yellow]Reading file:[/bold yellow] {file_path}")
 
     if file_path.endswith(".txt"):
-        with open(file_path, "r", encoding="utf-8") as file:
-            return file.read()
+        # Read block by block; the model's system prompt needs the whole text, though
+        return " ".join(extractors.iter_file_text(file_path))
     elif file_path.endswith(".pdf"):
         try:
-            extracted_text = extract_text(file_path)
+            extracted_text = "".join(extractors.iter_pdf_pages(file_path, engine="pdfminer"))
             return extracted_text.strip() if extracted_text else None
         except Exception as e:
             print(f"Error extracting text using PDFMiner: {e}")
             return None
     elif file_path.endswith(".csv"):
-        df = pd.read_csv(file_path)
-        return df.to_string()
+        return "\n".join(extractors.iter_file_text(file_path))
 
     return None
 
@@ -74,7 +71,11 @@ def create_model(file_path):
         "from": "llama3.2"
     }
 
-    response = requests.post(f"{OLLAMA_API_URL}/create", json=payload)
+    try:
+        response = transport.post(f"{OLLAMA_API_URL}/create", endpoint="create", json=payload)
+    except requests.RequestException as e:
+        console.print(f"[bold red]Error creating model:[/bold red] {e}")
+        return
 
     if response.status_code == 200:
         console.print(f"[bold green]Model '{model_name}' created successfully![/bold green] {response.text}")
@@ -88,37 +89,29 @@ def load_model():
         console.print("[bold red]Error:[/bold red] No model found. Create a model first.")
         return
 
-    response = requests.post(f"{OLLAMA_API_URL}/pull", json={"name": CUSTOM_MODEL_NAME})
+    try:
+        response = transport.post(f"{OLLAMA_API_URL}/pull", endpoint="pull", idempotent=True,
+                                  json={"name": CUSTOM_MODEL_NAME})
+    except requests.RequestException as e:
+        console.print(f"[bold red]Error loading model:[/bold red] {e}")
+        return
     if response.status_code == 200:
         console.print(f"[bold green]Model '{CUSTOM_MODEL_NAME}' loaded successfully![/bold green]")
     else:
         console.print(f"[bold red]Error loading model:[/bold red] {response.text}")
 
 
-# Get response from model
-def get_custom_model_response(prompt):
+# Get response from model (tokens are passed to on_token as they stream in)
+def get_custom_model_response(prompt, on_token=None, stats=None):
     if CUSTOM_MODEL_NAME is None:
         console.print("[bold red]Error:[/bold red] No model is set. Create a model first.")
         return "No model available."
 
-    payload = {
-        "model": CUSTOM_MODEL_NAME,
-        "prompt": prompt
-    }
-
-    response = requests.post(f"{OLLAMA_API_URL}/generate", json=payload)
-
-    full_response = ""
-
-    for line in response.iter_lines():
-        if line:
-            try:
-                json_data = json.loads(line.decode("utf-8"))  # Parse JSON line
-                chunk = json_data.get("response", "")
-                full_response += chunk  # Append chunk to full response
-            except json.JSONDecodeError:
-                continue  # Ignore incomplete JSON errors
-
+    try:
+        full_response = ollama_stream.generate(OLLAMA_API_URL, CUSTOM_MODEL_NAME, prompt, on_token=on_token, stats=stats)
+    except requests.RequestException as e:
+        console.print(f"[bold red]Error:[/bold red] Ollama request failed: {e}")
+        full_response = None
     return full_response if full_response else "No response from Ollama."
 
 
@@ -138,8 +131,13 @@ def chat():
             load_model()  # Ensure the model is loaded
             continue
 
-        response = get_custom_model_response(user_input)
-        console.print(f"[bold magenta]Bot:[/bold magenta] {response}")
+        console.print("[bold magenta]Bot:[/bold magenta] ", end="")
+        stats = {}
+        response = get_custom_model_response(user_input, on_token=ollama_stream.console_printer(console), stats=stats)
+        if "first_token_seconds" not in stats:
+            console.print(response, end="", markup=False)
+        console.print()
+        ollama_stream.print_generation_stats(console, stats)
 
 
 # Run chat
@@ -0,0 +1,4 @@
+# Retrieval-augmented chatbot over Ollama and pgvector (or an embedded vector
+# store), with a LlamaStack agent backend. Submodules are imported on demand;
+# importing the package itself loads nothing else.
+__version__ = "0.1.0"
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from . import metrics
+
+# Answer repeated questions from memory instead of running a new generation
+USE_ANSWER_CACHE = True
+
+# Minimum cosine similarity between a new query and a cached one for a hit
+ANSWER_CACHE_THRESHOLD = 0.95
+
+# LRU size bound and maximum age of a cached answer
+ANSWER_CACHE_MAX_ITEMS = 512
+ANSWER_CACHE_TTL_SECONDS = 6 * 3600
+
+
+# Semantic cache of generated answers keyed by the query embedding. A lookup
+# hits when a cached query of the same model is within the cosine threshold.
+# Answers depend on the ingested documents, so invalidate() (called whenever an
+# ingest adds or removes chunks) drops everything; entries also expire after
+# the TTL and the least recently used ones are evicted beyond max_items.
+class AnswerCache:
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_items=ANSWER_CACHE_MAX_ITEMS,
+                 ttl_seconds=ANSWER_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()   # id -> (model, unit query vector, answer, created)
+        self._next_id = 0
+        self._matrix = None             # (ids, stacked vectors), rebuilt after changes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry[3] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._stats["expirations"] += len(expired)
+            self._matrix = None
+
+    # Cached answer for a query embedding, or None
+    def get(self, model, embedding):
+        query = self._unit(embedding)
+        with self._lock:
+            self._expire(time.time())
+            answer = None
+            if self._entries:
+                if self._matrix is None:
+                    ids = list(self._entries)
+                    self._matrix = ids, np.stack([self._entries[key][1] for key in ids])
+                ids, vectors = self._matrix
+                if vectors.shape[1] == query.shape[0]:
+                    similarity = vectors @ query
+                    for index in np.argsort(-similarity):
+                        if similarity[index] < self.threshold:
+                            break
+                        entry = self._entries[ids[index]]
+                        if entry[0] == model:
+                            self._entries.move_to_end(ids[index])
+                            answer = entry[2]
+                            break
+            self._stats["hits" if answer is not None else "misses"] += 1
+        metrics.count("answer_cache_lookups_total", result="hit" if answer is not None else "miss")
+        return answer
+
+    def put(self, model, embedding, answer):
+        with self._lock:
+            self._entries[self._next_id] = (model, self._unit(embedding), answer, time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            self._matrix = None
+
+    # Forget every answer (the documents they were generated from changed)
+    def invalidate(self):
+        with self._lock:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["items"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# Process-wide cache shared by the chat pipeline and ingestion
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnswerCache()
+        return _default_cache
+
+
+# Invalidate the shared cache if one has been created
+def invalidate_default_cache():
+    with _default_cache_lock:
+        cache = _default_cache
+    if cache is not None:
+        cache.invalidate()
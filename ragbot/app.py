@@ -0,0 +1,336 @@
+import asyncio
+import os
+import subprocess
+
+import httpx
+from rich.console import Console
+from rich.prompt import Prompt
+
+from . import answer_cache, async_pipeline, bulk_ingest, chunking, conversation, embedding_cache, extractors, ingest, metrics
+from . import ollama_embed, ollama_stream, retrieval, transport, vector_store
+
+# PostgreSQL Connection Setup
+DB_CONFIG = {
+    "dbname": "chatbot",
+    "user": "postgres",
+    "password": "<password>",
+    "host": "localhost",
+    "port": 5432,
+}
+
+OLLAMA_API_URL = "http://localhost:11434/api"
+EMBED_BATCH_SIZE = ollama_embed.EMBED_BATCH_SIZE
+
+# Backend presets: the Ollama model used for answers and embeddings, the
+# embedding size, and whether ingested files are also baked into a custom
+# Ollama model (Modelfile + `ollama create`) before they are embedded
+BACKENDS = {
+    "pgvector": {"model": "llama3", "embed_model": "llama3", "embedding_dim": 4096, "custom_model": False},
+    "custom": {"model": "my_custom_model", "embed_model": "my_custom_model", "embedding_dim": 4096,
+               "custom_model": True},
+}
+
+# Vector store backend: "pgvector" (DB_CONFIG) or "mmap" (embedded, no server needed)
+VECTOR_STORE = "pgvector"
+VECTOR_STORE_PATH = "vector_store"
+
+# Custom model backend: training text and Modelfile written on every ingest
+TRAINING_DATA_FILE = "/Users/nbardiya/Downloads/testing_txt.txt"
+MODELFILE = "Modelfile"
+
+# Per-stage metrics (off by default): served at http://localhost:METRICS_PORT/metrics
+# (None disables the endpoint) and written to METRICS_DUMP_FILE at exit
+METRICS_ENABLED = False
+METRICS_PORT = 9464
+METRICS_DUMP_FILE = "metrics.prom"
+
+
+# Retrieval-augmented chat over Ollama and a vector store. This is the single
+# implementation behind the `ragbot` command and the chatbot*.py entry scripts.
+class RagChat:
+    def __init__(self, backend="pgvector", store_backend=VECTOR_STORE, store_path=VECTOR_STORE_PATH,
+                 db_config=DB_CONFIG, api_url=OLLAMA_API_URL, model=None, embed_model=None,
+                 embedding_dim=None, console=None):
+        preset = BACKENDS[backend]
+        self.backend = backend
+        self.api_url = api_url
+        self.model = model or preset["model"]
+        self.embed_model = embed_model or preset["embed_model"]
+        self.embedding_dim = embedding_dim or preset["embedding_dim"]
+        self.custom_model = preset["custom_model"]
+        self.console = console or Console()
+        # Opening a store only imports its driver; nothing connects until setup()
+        self.store = vector_store.open_store(store_backend, self.embedding_dim, db_config=db_config, path=store_path)
+
+    # Create Table for Embeddings (with its ANN index), or the embedded store's files
+    def setup_database(self):
+        self.store.setup()
+
+    # Start recording stage metrics, with gauges read from the store and the embedding cache
+    def setup_metrics(self, port=METRICS_PORT, dump_path=METRICS_DUMP_FILE):
+        cache = embedding_cache.get_default_cache()
+        metrics.gauge("vector_store_rows", lambda: self.store.stats()["rows"])
+        metrics.gauge("embedding_cache_memory_items", lambda: cache.stats()["memory_items"])
+        metrics.gauge("embedding_cache_disk_bytes", lambda: cache.stats()["disk_bytes"])
+        metrics.gauge("embedding_cache_hit_rate", lambda: round(cache.stats()["hit_rate"], 4))
+        metrics.gauge("answer_cache_items", lambda: answer_cache.get_default_cache().stats()["items"])
+        metrics.gauge("http_pool_requests", lambda: transport.pool_stats()["requests"])
+        metrics.gauge("http_pool_connections_opened", lambda: transport.pool_stats()["connections"])
+        metrics.gauge("http_connection_reuse_rate", lambda: round(transport.pool_stats()["reuse_rate"], 4))
+        metrics.enable(port=port, dump_path=dump_path)
+
+    def close(self):
+        self.store.close()
+
+    # Generate embeddings using Ollama API
+    def generate_embedding(self, text):
+        embeddings = self.generate_embeddings([text])
+        return embeddings[0] if embeddings else []
+
+    # Generate embeddings for a batch of texts in one Ollama call
+    def generate_embeddings(self, texts):
+        embeddings = ollama_embed.embed_texts(self.api_url, self.embed_model, texts)
+        if embeddings and any(len(embedding) != self.embedding_dim for embedding in embeddings):
+            self.console.print("[bold red]Error:[/bold red] Embedding size mismatch.")
+            return []
+        return embeddings
+
+    # Store embeddings in the vector store
+    def store_embedding(self, text):
+        embedding = self.generate_embedding(text)
+        if embedding:
+            self.insert_embedding(text, embedding)
+
+    # Insert a text whose embedding is already computed
+    def insert_embedding(self, text, embedding):
+        self.store.add([(text, embedding, None, None, None)])
+
+    # Retrieve most similar text from the vector store
+    def retrieve_similar_text(self, query_text):
+        query_embedding = self.generate_embedding(query_text)
+        if not query_embedding:
+            return None
+        return self.search_similar_text(query_embedding, query_text)
+
+    # Find stored passages for an already computed embedding: top-k candidates
+    # (fused with full-text matches for query_text in hybrid mode), reranked for
+    # diversity and packed into the prompt's context budget
+    def search_similar_text(self, query_embedding, query_text=None):
+        candidates, scores = retrieval.retrieve_candidates(self.store, query_embedding, query_text)
+        passages = retrieval.select_context(query_embedding, candidates, scores=scores)
+        return "\n\n".join(passages) if passages else None
+
+    # Build the final prompt from the retrieved context
+    @staticmethod
+    def build_prompt(similar_text, user_input):
+        context = f"Similar context: {similar_text}" if similar_text else "No prior knowledge."
+        return f"{context}\nUser: {user_input}"
+
+    # Get response from Ollama API (tokens are passed to on_token as they stream in)
+    def get_ollama_response(self, prompt, on_token=None, stats=None):
+        import requests
+        try:
+            full_response = ollama_stream.generate(self.api_url, self.model, prompt, on_token=on_token, stats=stats)
+        except requests.RequestException as error:
+            self.console.print(f"[bold red]Error:[/bold red] Ollama request failed: {error}")
+            full_response = None
+        return full_response if full_response else "No response from Ollama."
+
+    # Read file from Google Drive
+    @staticmethod
+    def read_google_drive_file(file_id):
+        import requests
+        url = f"https://drive.google.com/uc?export=download&id={file_id}"
+        try:
+            response = transport.get(url)
+        except requests.RequestException:
+            return ""
+        if response.status_code == 200:
+            return response.text
+        return ""
+
+    # Create Modelfile
+    def create_modelfile(self):
+        with open(MODELFILE, "w") as f:
+            f.write(f"""
+FROM llama3
+
+SYSTEM "You are a highly reliable, concise, and precise assistant. "
+        "When answering user queries, adhere to the following guidelines:\n"
+        "1. **Strict Context Usage**: Base your response exclusively on the provided retrieved context.\n"
+        "2. **Clarity and Brevity**: Provide clear, focused, and concise responses.\n"
+        "3. **Handling Insufficient Information**: If the context lacks sufficient details, state that the necessary information is unavailable.\n"
+        "4. **Avoid Inference or Speculation**: Stick to explicit context without speculation.\n"
+        "5. **Disambiguation**: If a query is ambiguous, seek clarification before responding.\n"
+        "6. **Neutral Tone**: Maintain objectivity in your responses.\n"
+        "7. **User-Centric**: Ensure accessibility and clarity for a general audience.\n""
+
+ADAPTER "{TRAINING_DATA_FILE}"
+        """)
+        self.console.print("[bold green]Modelfile created successfully.[/bold green]")
+
+    # Build and load the custom model
+    def build_custom_model(self):
+        subprocess.run(["sudo", "ollama", "create", self.model, "-f", MODELFILE], check=True)
+        self.console.print("[bold green]Custom model built and loaded successfully.[/bold green]")
+
+    # Write the extracted text to the training data file and rebuild the custom
+    # model from it; returns the training file's text pieces, or None without text
+    def train_custom_model(self, pieces):
+        has_text = False
+        with open(TRAINING_DATA_FILE, "w") as f:
+            for piece in pieces:
+                f.write(piece if not has_text else " " + piece)
+                has_text = True
+        if not has_text:
+            return None
+        self.create_modelfile()
+        self.build_custom_model()
+        return extractors.iter_file_text(TRAINING_DATA_FILE)
+
+    # Manifest check of a local file against store (the chat's by default):
+    # returns (source, mtime, content_hash, unchanged, by_rows, chunker)
+    def check_local_file(self, file_path, store=None):
+        # CSVs are chunked by whole rows (unless the rows go into a custom model first)
+        by_rows = extractors.file_extension(file_path) == ".csv" and not self.custom_model
+        chunker = chunking.row_chunking_signature() if by_rows else None
+        source, mtime = os.path.abspath(file_path), os.path.getmtime(file_path)
+        unchanged, content_hash = ingest.check_manifest(
+            store or self.store, source, mtime, lambda: ingest.hash_file(file_path), chunker=chunker
+        )
+        return source, mtime, content_hash, unchanged, by_rows, chunker
+
+    # Process a `file` argument: a single file or URL, or a directory or glob
+    # pattern whose files are ingested in parallel (one by one for the custom
+    # model backend, which rebuilds the model for every file)
+    def process_path(self, pattern):
+        if not bulk_ingest.is_bulk(pattern):
+            return self.process_file(pattern)
+        paths = bulk_ingest.expand_paths(pattern)
+        if not paths:
+            self.console.print(f"[bold red]Error:[/bold red] No files to ingest in {pattern}")
+            return
+        if self.custom_model:
+            return [self.process_file(path) for path in paths]
+        totals = bulk_ingest.ingest_paths(self, paths)
+        bulk_ingest.print_bulk_report(self.console, totals)
+        return totals
+
+    # Process file and store embeddings; returns the ingest stats ({"skipped": 1}
+    # for a file unchanged since it was last ingested), or None when the file
+    # could not be ingested
+    def process_file(self, file_path):
+        pieces = []
+        source, mtime, content_hash, unchanged = file_path, None, None, False
+        by_rows, chunker = False, None
+
+        if file_path.startswith("https://drive.google.com"):
+            file_id = file_path.split("id=")[-1]
+            extracted_text = self.read_google_drive_file(file_id)
+            pieces = [extracted_text] if extracted_text else []
+            unchanged, content_hash = ingest.check_manifest(
+                self.store, source, None, lambda: ingest.hash_text(extracted_text)
+            )
+        elif os.path.exists(file_path):
+            source, mtime, content_hash, unchanged, by_rows, chunker = self.check_local_file(file_path)
+            if not unchanged:
+                self.console.print(f"[bold yellow]Processing file:[/bold yellow] {file_path}")
+                if by_rows:
+                    pieces = extractors.iter_csv_rows(file_path)
+                else:
+                    pieces = extractors.iter_file_text(file_path)
+        else:
+            self.console.print(f"[bold red]Error:[/bold red] File not found: {file_path}")
+            return
+
+        if unchanged:
+            # Unchanged content: no need to rebuild the custom model or re-embed
+            self.console.print(f"[bold yellow]Skipped:[/bold yellow] {file_path} is unchanged since it was last ingested.")
+            return {"skipped": 1}
+
+        if self.custom_model:
+            pieces = self.train_custom_model(pieces)
+            if pieces is None:
+                self.console.print("[bold red]Error:[/bold red] No text found in file.")
+                return
+
+        # Split text into token-bounded chunks (CSV rows into groups of whole rows,
+        # tagged with their row range) and embed them while the file is still being read
+        chunks = chunking.row_chunks(pieces) if by_rows else chunking.chunk_stream(pieces)
+
+        stats = ingest.ingest_chunks(
+            chunks, self.generate_embeddings, self.store, EMBED_BATCH_SIZE,
+            source=source, content_hash=content_hash, mtime=mtime, chunker=chunker
+        )
+        self.store.maintain()
+        if not stats["chunks"]:
+            self.console.print("[bold red]Error:[/bold red] No text found in file.")
+            return
+        ingest.print_ingest_report(self.console, stats)
+        return stats
+
+    # Show vector store and embedding cache statistics
+    def show_stats(self):
+        stats = self.store.stats()
+        self.console.print(
+            f"[bold yellow]Vector store ({stats.pop('backend')}):[/bold yellow] "
+            + ", ".join(f"{name.replace('_', ' ')} {value}" for name, value in stats.items())
+        )
+        stats = embedding_cache.get_default_cache().stats()
+        self.console.print(
+            f"[bold yellow]Embedding cache:[/bold yellow] {stats['memory_hits']} memory hits, "
+            f"{stats['disk_hits']} disk hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+            f"{stats['memory_items']} in memory, {stats['disk_bytes'] / 1024 / 1024:.1f} MB on disk, "
+            f"{stats['evictions']} evicted"
+        )
+        stats = answer_cache.get_default_cache().stats()
+        self.console.print(
+            f"[bold yellow]Answer cache:[/bold yellow] {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%} hit rate), {stats['items']} answers, {stats['evictions']} evicted, "
+            f"{stats['expirations']} expired, {stats['invalidations']} invalidations"
+        )
+
+    # The asyncio pipeline the chat loop answers through
+    def pipeline(self):
+        return async_pipeline.ChatPipeline(
+            self.api_url, self.model, self.embed_model, self.search_similar_text, self.insert_embedding,
+            self.build_prompt,
+            answer_cache=answer_cache.get_default_cache() if answer_cache.USE_ANSWER_CACHE else None,
+            console=self.console
+        )
+
+    # Main Chat Loop (asyncio: each message is written back in the background while the answer streams)
+    async def chat_async(self):
+        console = self.console
+        console.print("[bold green]Chatbot CLI - Type 'exit' to quit, 'file <path>' to process a file, directory or glob pattern, or 'stats' for runtime stats[/bold green]")
+        session = conversation.Conversation() if conversation.USE_CONVERSATION_CONTEXT else None
+        async with self.pipeline() as pipeline:
+            while True:
+                user_input = await asyncio.to_thread(Prompt.ask, "[bold cyan]You[/bold cyan]")
+
+                if user_input.lower() == "exit":
+                    break
+                elif user_input.lower() == "stats":
+                    self.show_stats()
+                    continue
+                elif user_input.lower().startswith("file "):
+                    file_path = user_input.split("file ", 1)[1].strip()
+                    await asyncio.to_thread(self.process_path, file_path)
+                    continue
+
+                # Retrieve similar text, stream the answer and store the message
+                console.print("[bold magenta]Bot:[/bold magenta] ", end="")
+                stats = {}
+                try:
+                    response = await pipeline.answer(user_input, on_token=ollama_stream.console_printer(console),
+                                                     stats=stats, conversation=session)
+                except httpx.HTTPError as error:
+                    console.print(f"\n[bold red]Error:[/bold red] Ollama request failed: {error}")
+                    continue
+                if not response:
+                    console.print("No response from Ollama.", end="")
+                console.print()
+                ollama_stream.print_generation_stats(console, stats)
+
+    def chat(self):
+        asyncio.run(self.chat_async())
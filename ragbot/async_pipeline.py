@@ -0,0 +1,143 @@
+import asyncio
+import inspect
+
+from rich.console import Console
+
+from . import embed_batcher, metrics, ollama_embed, ollama_stream, transport
+
+
+# Asyncio chat pipeline: Ollama is called through an async HTTP client, the
+# blocking Postgres helpers run in worker threads (the connection pool is
+# thread-safe), and each user message is written back in the background with
+# the embedding already computed for retrieval, overlapping the answer stream.
+# With an answer_cache, questions close to an earlier one skip retrieval and
+# generation, unless a conversation's earlier turns make the answer depend on more
+# than the question (cache entries are keyed only on the question embedding).
+# Embeddings for concurrent turns are coalesced by an EmbeddingBatcher. With a
+# Conversation, each turn continues from the token context of the previous one;
+# a conversation that outgrows its budget is summarized in the background and
+# its next turn waits for the summary.
+class ChatPipeline:
+    def __init__(self, api_url, model, embed_model, search, insert, build_prompt, answer_cache=None,
+                 console=None):
+        self.api_url = api_url
+        self.model = model
+        self.embed_model = embed_model
+        self.search = search                # search(embedding, text) -> context text or None
+        self.insert = insert                # insert(text, embedding), or None to not store messages
+        self.build_prompt = build_prompt    # build_prompt(context, user_input) -> prompt
+        self.answer_cache = answer_cache
+        self.console = console or Console(stderr=True)
+        self.client = None
+        self.batcher = None
+        self._pending = set()
+        self._summaries = {}    # conversation -> summary being written for it
+
+    async def __aenter__(self):
+        self.client = transport.async_client()
+        if embed_batcher.USE_EMBED_BATCHER:
+            self.batcher = embed_batcher.EmbeddingBatcher(self.client, self.api_url, self.embed_model)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.drain()
+        await self.client.aclose()
+
+    # Embed a single text (served from the embedding cache when possible)
+    async def embed(self, text):
+        if self.batcher is not None:
+            return await self.batcher.embed(text)
+        embeddings = await ollama_embed.embed_texts_async(self.client, self.api_url, self.embed_model, [text])
+        return embeddings[0] if embeddings else None
+
+    # Schedule a blocking write in a worker thread without waiting for it
+    def write_back(self, text, embedding):
+        task = asyncio.create_task(asyncio.to_thread(self.insert, text, embedding))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        task.add_done_callback(self._report_write_error)
+
+    # Nobody awaits a write-back, so its failure is reported here
+    def _report_write_error(self, task):
+        if task.cancelled() or task.exception() is None:
+            return
+        metrics.count("errors_total", stage="write_back")
+        self.console.print(f"[bold red]Error:[/bold red] Could not store the message: {task.exception()}")
+
+    # Wait for all background writes and summaries to finish (failures are
+    # reported as they happen)
+    async def drain(self):
+        tasks = self._pending | set(self._summaries.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Answer one user message: embed -> retrieve -> stream, with write-back overlapped
+    @metrics.timed("turn")
+    async def answer(self, user_input, on_token=None, stats=None, conversation=None):
+        stats = {} if stats is None else stats
+        if conversation is not None and conversation in self._summaries:
+            # The summary restarts the context this turn continues from
+            await asyncio.gather(self._summaries[conversation], return_exceptions=True)
+        embedding = await self.embed(user_input)
+        use_cache = self.answer_cache is not None and (conversation is None or not conversation.started())
+        if embedding and use_cache:
+            cached = self.answer_cache.get(self.model, embedding)
+            if cached is not None:
+                # Near-duplicate of an answered question, which is already stored
+                stats["cached"] = True
+                if conversation is not None:
+                    conversation.update(user_input, cached, None)
+                if on_token is not None:
+                    result = on_token(cached)
+                    if inspect.isawaitable(result):
+                        await result
+                return cached
+
+        context = None
+        if embedding:
+            context = await asyncio.to_thread(self.search, embedding, user_input)
+            # Stored only after retrieval so the message cannot match itself
+            if self.insert is not None:
+                self.write_back(user_input, embedding)
+
+        prompt = self.build_prompt(context, user_input)
+        if conversation is not None:
+            prompt = conversation.prompt(prompt)
+        response = await ollama_stream.generate_async(
+            self.client, self.api_url, self.model, prompt, on_token=on_token, stats=stats,
+            context=conversation.context if conversation is not None else None
+        )
+        # The token context can be tens of thousands of ints; only the conversation keeps it
+        returned_context = stats.pop("context", None)
+        if response and conversation is not None:
+            if conversation.update(user_input, response, returned_context):
+                self.summarize_later(conversation)
+            stats["context_tokens"] = len(returned_context or ())
+        if response and embedding and use_cache:
+            self.answer_cache.put(self.model, embedding, response)
+        return response
+
+    # Replace a conversation that outgrew its token budget with a model-written summary
+    @metrics.timed("summarize")
+    async def summarize(self, conversation):
+        summary = await ollama_stream.generate_async(
+            self.client, self.api_url, self.model, conversation.summary_prompt()
+        )
+        conversation.summarize(summary)
+
+    # Summarize off the turn that went over budget, which returns (and frees its
+    # generation slot) right away. If the summary fails, the conversation
+    # restarts from its latest turns instead.
+    def summarize_later(self, conversation):
+        async def run():
+            try:
+                await self.summarize(conversation)
+            except Exception as error:
+                self.console.print(f"[bold red]Error:[/bold red] Could not summarize the conversation: {error}")
+                conversation.truncate()
+
+        task = asyncio.create_task(run())
+        self._summaries[conversation] = task
+        task.add_done_callback(lambda _: self._summaries.pop(conversation, None))
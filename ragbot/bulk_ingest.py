@@ -0,0 +1,270 @@
+import collections
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import chunking, extractors, ingest, metrics
+
+# File types picked up when a directory or glob pattern is ingested
+INGEST_EXTENSIONS = (".txt", ".pdf", ".csv")
+
+# Files are extracted and chunked in this many worker processes
+INGEST_WORKERS = os.cpu_count() or 1
+
+# Most embedding requests in flight toward Ollama at once, across all files
+EMBED_CONCURRENCY = 4
+
+# Files larger than this are read and chunked as a stream in the ingesting
+# thread instead of being chunked whole in a worker process
+STREAM_MIN_BYTES = 64 * 1024 * 1024
+
+# The writer coalesces queued batches (from any file) into store calls of at
+# most this many rows
+WRITE_BATCH_ROWS = 512
+
+
+def _matches(path):
+    return os.path.isfile(path) and extractors.file_extension(path) in INGEST_EXTENSIONS
+
+
+# Expand a `file` argument into the files to ingest: a directory is walked
+# recursively, a glob pattern ("docs/**/*.pdf") is expanded, anything else is
+# returned as it is. Results are sorted so runs are repeatable.
+def expand_paths(pattern):
+    if os.path.isdir(pattern):
+        paths = []
+        for root, dirs, files in os.walk(pattern):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files))
+        return [path for path in paths if _matches(path)]
+    if glob.has_magic(pattern):
+        return sorted(path for path in glob.glob(pattern, recursive=True) if _matches(path))
+    return [pattern]
+
+
+# Whether a `file` argument names more than one file
+def is_bulk(pattern):
+    return os.path.isdir(pattern) or glob.has_magic(pattern)
+
+
+# Read and chunk a whole file; runs in a worker process. PDFs are extracted
+# page by page here since the files themselves are already spread over the pool.
+def _extract_chunks(file_path, by_rows):
+    if by_rows:
+        return list(chunking.row_chunks(extractors.iter_csv_rows(file_path)))
+    return list(chunking.chunk_stream(extractors.iter_file_text(file_path, pdf_workers=1)))
+
+
+def _stream_chunks(file_path, by_rows):
+    if by_rows:
+        return chunking.row_chunks(extractors.iter_csv_rows(file_path))
+    return chunking.chunk_stream(extractors.iter_file_text(file_path))
+
+
+# Stands in for the store in ingest_chunks: add() and finish_source() are
+# queued for a single writer thread, which merges consecutive add() calls into
+# larger store.add() calls, committing the latest checkpoint of each source
+# with them. Other calls (manifest lookups, chunk hashes) go to
+# the store directly, serialized with the writes since the mmap store is not
+# thread-safe. A source whose rows failed to write gets no manifest and no
+# further checkpoints, so the next run retries it from its last good checkpoint.
+# failed_rows counts the rows of each source that could not be stored.
+class BatchWriter:
+    def __init__(self, store, batch_rows=WRITE_BATCH_ROWS):
+        self.store = store
+        self.batch_rows = batch_rows
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.failed_sources = set()
+        self.failed_rows = collections.Counter()
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        def locked(*args, **kwargs):
+            with self.lock:
+                return method(*args, **kwargs)
+        return locked
+
+    def add(self, rows, checkpoints=None):
+        self.queue.put(("add", (rows, checkpoints or ())))
+
+    def finish_source(self, source, removed, manifest):
+        self.queue.put(("finish", (source, removed, manifest)))
+
+    # Wait for everything queued so far to be written, then stop the thread
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    @metrics.timed("ingest_write")
+    def _store_rows(self, rows, checkpoints):
+        with self.lock:
+            self.store.add(rows, checkpoints=checkpoints)
+
+    def _write(self, rows, checkpoints):
+        if not rows:
+            return
+        checkpoints = [checkpoint for source, checkpoint in checkpoints.items()
+                       if source not in self.failed_sources]
+        try:
+            self._store_rows(rows, checkpoints)
+        except Exception as error:
+            self.errors.append(error)
+            self.failed_rows.update(row[2] for row in rows)
+            self.failed_sources.update(self.failed_rows)
+
+    def _run(self):
+        rows, checkpoints = [], {}
+        while True:
+            item = self.queue.get()
+            # Keep merging while more batches are already waiting
+            while item is not None and item[0] == "add":
+                rows.extend(item[1][0])
+                checkpoints.update((checkpoint["source"], checkpoint) for checkpoint in item[1][1])
+                if len(rows) >= self.batch_rows:
+                    self._write(rows, checkpoints)
+                    rows, checkpoints = [], {}
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = self.queue.get()
+            self._write(rows, checkpoints)
+            rows, checkpoints = [], {}
+            if item is None:
+                return
+            source, removed, manifest = item[1]
+            if source in self.failed_sources:
+                manifest = None
+            try:
+                with self.lock:
+                    self.store.finish_source(source, removed, manifest)
+            except Exception as error:
+                self.errors.append(error)
+                self.failed_sources.add(source)
+
+
+def _progress(console):
+    from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn, TimeRemainingColumn
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[bold yellow]Ingesting[/bold yellow]"),
+        BarColumn(),
+        TextColumn("{task.fields[files]}/{task.fields[total_files]} files"),
+        TextColumn("{task.fields[chunks]} chunks"),
+        TextColumn("{task.fields[rate]:.1f} chunks/s"),
+        TimeRemainingColumn(),
+        console=console,
+        transient=True,
+    )
+
+
+# Ingest many files at once. Worker processes extract and chunk files, one
+# thread per file in flight runs ingest_chunks, at most embed_concurrency
+# embedding requests go to Ollama at a time, and a single writer thread stores
+# the results. Progress (files, chunks, chunks/s and ETA by bytes) is shown on
+# the chat's console. Returns the summed ingest stats; a file the writer could
+# not finish storing counts as an error, and its rows that were not stored
+# count as write_failed instead of stored.
+def ingest_paths(chat, paths, workers=INGEST_WORKERS, embed_concurrency=EMBED_CONCURRENCY,
+                 batch_size=ingest.EMBED_BATCH_SIZE):
+    totals = {"files": 0, "skipped": 0, "errors": 0, "chunks": 0, "stored": 0, "unchanged": 0,
+              "resumed": 0, "removed": 0, "failed": 0, "write_failed": 0, "seconds": 0.0}
+    ingested = {}   # source -> path of every file handed to the writer
+    sizes = {path: os.path.getsize(path) for path in paths}
+    embed_slots = threading.BoundedSemaphore(embed_concurrency)
+    lock = threading.Lock()
+    writer = BatchWriter(chat.store)
+    start = time.perf_counter()
+    progress = _progress(chat.console)
+    task = progress.add_task("ingest", total=sum(sizes.values()) or 1, files=0,
+                             total_files=len(paths), chunks=0, rate=0.0)
+
+    def embed_batch(texts):
+        with embed_slots:
+            embeddings = chat.generate_embeddings(texts)
+        with lock:
+            totals["chunks"] += len(texts)
+            rate = totals["chunks"] / (time.perf_counter() - start)
+        progress.update(task, chunks=totals["chunks"], rate=rate)
+        return embeddings
+
+    def ingest_one(file_path, pool):
+        source, mtime, content_hash, unchanged, by_rows, chunker = chat.check_local_file(file_path, writer)
+        if unchanged:
+            return "skipped", source, None
+        if sizes[file_path] >= STREAM_MIN_BYTES:
+            chunks = _stream_chunks(file_path, by_rows)
+        else:
+            chunks = pool.submit(_extract_chunks, file_path, by_rows).result()
+        stats = ingest.ingest_chunks(
+            chunks, embed_batch, writer, batch_size,
+            source=source, content_hash=content_hash, mtime=mtime, chunker=chunker
+        )
+        return "ingested", source, stats
+
+    with progress, extractors.process_pool(workers) as pool:
+        # Enough files in flight to keep both the workers and the embedding slots busy
+        with ThreadPoolExecutor(max_workers=workers + embed_concurrency) as threads:
+            futures = {threads.submit(ingest_one, path, pool): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    outcome, source, stats = future.result()
+                except Exception as error:
+                    totals["errors"] += 1
+                    progress.console.print(f"[bold red]Error:[/bold red] Could not ingest {path}: {error}")
+                else:
+                    if outcome == "skipped":
+                        totals["skipped"] += 1
+                    else:
+                        totals["files"] += 1
+                        ingested[source] = path
+                        for name in ("stored", "unchanged", "resumed", "removed", "failed"):
+                            totals[name] += stats[name]
+                progress.update(task, advance=sizes[path], files=totals["files"] + totals["skipped"] + totals["errors"])
+        writer.close()
+
+    chat.store.maintain()
+    for error in writer.errors:
+        chat.console.print(f"[bold red]Error:[/bold red] Could not write chunks: {error}")
+    for source, path in ingested.items():
+        if source in writer.failed_sources:
+            totals["files"] -= 1
+            totals["errors"] += 1
+            totals["stored"] -= writer.failed_rows[source]
+            totals["write_failed"] += writer.failed_rows[source]
+            chat.console.print(f"[bold red]Error:[/bold red] Could not store {path}; it is retried on the next run.")
+    totals["seconds"] = time.perf_counter() - start
+    totals["chunks_per_second"] = totals["stored"] / totals["seconds"] if totals["seconds"] else 0.0
+    return totals
+
+
+# Whether a RagChat.process_path result (one file's stats, a list of them or
+# ingest_paths totals) records a file, chunk or write that failed. None, which
+# process_file and process_path return when nothing could be ingested, counts
+# as a failure.
+def has_errors(result):
+    results = result if isinstance(result, list) else [result]
+    return any(stats is None or stats.get("errors") or stats.get("failed") or stats.get("write_failed")
+               for stats in results)
+
+
+# Summarize an ingest_paths run on the console
+def print_bulk_report(console, totals):
+    if totals["failed"]:
+        console.print(f"[bold red]Error:[/bold red] {totals['failed']} chunks could not be embedded.")
+    if totals["write_failed"]:
+        console.print(f"[bold red]Error:[/bold red] {totals['write_failed']} chunks could not be stored.")
+    console.print(
+        f"[bold green]Processed {totals['files']} files ({totals['skipped']} unchanged, "
+        f"{totals['errors']} failed). Embedded {totals['stored']} new chunks, skipped "
+        f"{totals['unchanged']} unchanged and {totals['resumed']} stored by interrupted runs, removed {totals['removed']} stale "
+        f"({totals['chunks_per_second']:.1f} chunks/s in {totals['seconds']:.1f} s).[/bold green]"
+    )
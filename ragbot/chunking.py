@@ -0,0 +1,176 @@
+import re
+
+# Chunking strategy used by process_file: "tokens" (sentence-aware) or "fixed" (characters)
+CHUNK_STRATEGY = "tokens"
+
+# Fixed strategy: chunk length in characters
+CHUNK_SIZE = 500
+
+# Token strategy: chunk budget, tokens repeated from the previous chunk, and how
+# full a chunk must be before a paragraph break ends it early
+CHUNK_TOKENS = 192
+CHUNK_OVERLAP_TOKENS = 24
+PARAGRAPH_SNAP_RATIO = 0.5
+
+# Text without any sentence boundary is cut at whitespace once it gets this long
+MAX_SENTENCE_CHARS = 20000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+# Fast approximation of a BPE token count: one token per word or punctuation mark.
+# Any callable with the same signature (e.g. a real tokenizer) can be passed instead.
+def approx_token_count(text):
+    return len(_TOKEN.findall(text))
+
+
+# Cut a stream of text pieces into fixed-size chunks without joining the whole text first
+def fixed_size_chunks(pieces, chunk_size=CHUNK_SIZE, separator=" "):
+    buffer = ""
+    for index, piece in enumerate(pieces):
+        buffer = buffer + separator + piece if index else piece
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            yield buffer[start:start + chunk_size]
+            start += chunk_size
+        buffer = buffer[start:]
+    if buffer:
+        yield buffer
+
+
+# Yield (sentence, ends_paragraph) from a stream of text pieces, keeping only the
+# unfinished tail of the stream in memory
+def _iter_sentences(pieces, separator):
+    buffer = ""
+    for index, piece in enumerate(pieces):
+        buffer = buffer + separator + piece if index else piece
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            yield buffer[start:match.start()], match.group().count("\n") >= 2
+            start = match.end()
+        buffer = buffer[start:]
+
+        while len(buffer) > MAX_SENTENCE_CHARS:
+            cut = buffer.rfind(" ", 0, MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else MAX_SENTENCE_CHARS
+            yield buffer[:cut], False
+            buffer = buffer[cut:]
+    if buffer.strip():
+        yield buffer, True
+
+
+# Split a sentence that alone exceeds max_tokens at word boundaries
+def _split_long(sentence, max_tokens, count_tokens):
+    tokens = count_tokens(sentence)
+    if tokens <= max_tokens:
+        yield sentence, tokens
+        return
+
+    words, words_tokens = [], 0
+    for word in sentence.split():
+        word_tokens = count_tokens(word)
+        if words and words_tokens + word_tokens > max_tokens:
+            yield " ".join(words), words_tokens
+            words, words_tokens = [], 0
+        words.append(word)
+        words_tokens += word_tokens
+    if words:
+        yield " ".join(words), words_tokens
+
+
+# Trailing sentences of a chunk that fit in the overlap budget
+def _overlap_tail(sentences, overlap_tokens):
+    tail, tail_tokens = [], 0
+    for sentence, tokens in reversed(sentences):
+        if tail_tokens + tokens > overlap_tokens:
+            break
+        tail.insert(0, (sentence, tokens))
+        tail_tokens += tokens
+    return tail
+
+
+# Group sentences from a stream of text pieces into chunks of at most max_tokens,
+# repeating up to overlap_tokens of trailing sentences at the start of the next
+# chunk and ending chunks early at paragraph breaks once they are reasonably full
+def token_chunks(pieces, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                 count_tokens=approx_token_count, separator=" "):
+    current, current_tokens, fresh = [], 0, False
+
+    for sentence, ends_paragraph in _iter_sentences(pieces, separator):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        for part, tokens in _split_long(sentence, max_tokens, count_tokens):
+            if current and current_tokens + tokens > max_tokens:
+                if fresh:
+                    yield " ".join(text for text, _ in current)
+                current = _overlap_tail(current, overlap_tokens)
+                current_tokens = sum(t for _, t in current)
+                fresh = False
+                if current_tokens + tokens > max_tokens:
+                    current, current_tokens = [], 0
+            current.append((part, tokens))
+            current_tokens += tokens
+            fresh = True
+
+        if ends_paragraph and fresh and current_tokens >= max_tokens * PARAGRAPH_SNAP_RATIO:
+            yield " ".join(text for text, _ in current)
+            current, current_tokens, fresh = [], 0, False
+
+    if fresh:
+        yield " ".join(text for text, _ in current)
+
+
+def _row_location(first, last):
+    return f"row {first}" if first == last else f"rows {first}-{last}"
+
+
+# Group (row_number, row_text) pairs, e.g. from extractors.iter_csv_rows, into
+# chunks of whole rows of at most max_tokens, one row per line. Yields
+# (chunk, location) with the row range the chunk covers. A row that alone
+# exceeds max_tokens is split at word boundaries into chunks of its own.
+def row_chunks(rows, max_tokens=CHUNK_TOKENS, count_tokens=approx_token_count):
+    current, current_tokens, first = [], 0, None
+    last = None
+    for number, text in rows:
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            yield "\n".join(current), _row_location(first, last)
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            for part, _ in _split_long(text, max_tokens, count_tokens):
+                yield part, _row_location(number, number)
+            continue
+        if not current:
+            first = number
+        current.append(text)
+        current_tokens += tokens
+        last = number
+    if current:
+        yield "\n".join(current), _row_location(first, last)
+
+
+CHUNKERS = {
+    "fixed": fixed_size_chunks,
+    "tokens": token_chunks,
+}
+
+
+# Chunk a stream of text pieces with the configured (or given) strategy
+def chunk_stream(pieces, strategy=None, **options):
+    return CHUNKERS[strategy or CHUNK_STRATEGY](pieces, **options)
+
+
+# Identifies the chunking settings, so a change of settings forces re-ingestion
+def chunking_signature(strategy=None):
+    strategy = strategy or CHUNK_STRATEGY
+    if strategy == "fixed":
+        return f"fixed:{CHUNK_SIZE}"
+    return f"{strategy}:{CHUNK_TOKENS}:{CHUNK_OVERLAP_TOKENS}:{PARAGRAPH_SNAP_RATIO}"
+
+
+# Same for CSV files, which are always chunked by rows
+def row_chunking_signature():
+    return f"rows:{CHUNK_TOKENS}"
@@ -0,0 +1,60 @@
+import argparse
+import atexit
+import sys
+
+# "pgvector": Ollama + vector store, "custom": Ollama custom model rebuilt from
+# every ingested file, "llamastack": LlamaStack agent with its own RAG tool
+BACKEND_CHOICES = ("pgvector", "custom", "llamastack")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ragbot", description="Retrieval-augmented chatbot CLI.")
+    parser.add_argument("--backend", choices=BACKEND_CHOICES, default="pgvector")
+    parser.add_argument("--store", choices=("pgvector", "mmap"), help="Vector store backend")
+    parser.add_argument("--store-path", help="Directory of the embedded (mmap) vector store")
+    parser.add_argument("--ollama-url", help="Ollama API base URL, e.g. http://localhost:11434/api")
+    parser.add_argument("--model", help="Ollama model used for answers")
+    parser.add_argument("--embed-model", help="Ollama model used for embeddings")
+    parser.add_argument("--embedding-dim", type=int, help="Embedding size of the embed model")
+    parser.add_argument("--metrics", action="store_true", help="Record per-stage metrics")
+    parser.add_argument("--metrics-port", type=int, help="Serve metrics on this localhost port")
+    parser.add_argument("--serve", action="store_true", help="Serve chat sessions over HTTP instead of the prompt")
+    parser.add_argument("--host", help="Address the HTTP server binds to")
+    parser.add_argument("--port", type=int, help="Port the HTTP server listens on")
+    parser.add_argument("--ingest", metavar="PATH",
+                        help="Ingest a file, directory or glob pattern and exit (status 1 if anything failed)")
+    return parser
+
+
+# Entry point of the `ragbot` command. Backend modules (and through them the
+# DB drivers and HTTP clients) are imported only once the backend is known.
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.backend == "llamastack":
+        from . import llamastack
+        llamastack.main()
+        return
+
+    from . import app
+    options = {
+        "store_backend": args.store or app.VECTOR_STORE,
+        "store_path": args.store_path or app.VECTOR_STORE_PATH,
+        "api_url": args.ollama_url or app.OLLAMA_API_URL,
+        "model": args.model,
+        "embed_model": args.embed_model,
+        "embedding_dim": args.embedding_dim,
+    }
+    chat = app.RagChat(args.backend, **options)
+    atexit.register(chat.close)
+    chat.setup_database()
+    if args.metrics or app.METRICS_ENABLED:
+        chat.setup_metrics(port=args.metrics_port or app.METRICS_PORT)
+    if args.ingest:
+        from . import bulk_ingest
+        sys.exit(1 if bulk_ingest.has_errors(chat.process_path(args.ingest)) else 0)
+    if args.serve:
+        from . import server
+        server.serve(chat, host=args.host or server.SERVER_HOST, port=args.port or server.SERVER_PORT)
+    else:
+        chat.chat()
@@ -0,0 +1,104 @@
+from . import chunking
+
+# Carry the conversation between turns as the token context Ollama returns, so
+# earlier turns are not sent (and prefilled) again
+USE_CONVERSATION_CONTEXT = True
+
+# Most context tokens carried into the next turn. Beyond that the conversation
+# is either "summarize"d by the model or "truncate"d to its latest turns, and
+# the result is sent once as text to start a fresh context.
+CONVERSATION_TOKEN_BUDGET = 4096
+CONVERSATION_OVERFLOW = "summarize"
+
+# Share of the budget the restarted conversation may take
+RESTART_BUDGET_RATIO = 0.25
+
+SUMMARY_PROMPT = (
+    "Summarize the following conversation in a few sentences, keeping names, "
+    "facts and open questions the user may refer back to.\n\n{transcript}\n\nSummary:"
+)
+
+
+def transcript(turns):
+    return "\n".join(f"User: {user}\nAssistant: {answer}" for user, answer in turns)
+
+
+# Per-session conversation state: Ollama's context token array after the last
+# turn, plus the turns as text for when the context has to be rebuilt
+class Conversation:
+    def __init__(self, token_budget=CONVERSATION_TOKEN_BUDGET, overflow=CONVERSATION_OVERFLOW,
+                 count_tokens=chunking.approx_token_count):
+        self.token_budget = token_budget
+        self.overflow = overflow
+        self.count_tokens = count_tokens
+        self.context = None     # Ollama's token array, None to start a new one
+        self.preamble = None    # Text that starts the next context (summary or recent turns)
+        self.summary = None     # Latest model-written summary of the earlier turns
+        self.turns = []         # (user, answer) since the context was last restarted
+        self.restarts = 0
+
+    # Whether earlier turns shape the next answer (then answers cannot come from,
+    # or go into, the shared answer cache)
+    def started(self):
+        return bool(self.context or self.preamble or self.turns)
+
+    # Build this turn's prompt; after a restart it also carries the earlier conversation
+    def prompt(self, prompt):
+        if self.context is None and self.preamble:
+            return f"Conversation so far:\n{self.preamble}\n\n{prompt}"
+        return prompt
+
+    # Record a finished turn with the context Ollama returned for it. Returns True
+    # when the context went over budget and summarize() should be called.
+    def update(self, user_input, answer, context):
+        self.turns.append((user_input, answer))
+        if context is None:
+            # Answered without the model (e.g. from the answer cache): the model has
+            # not seen this turn, so it goes into the next prompt as text. A context
+            # carried so far is kept as it is.
+            if self.context is None:
+                self.preamble = "\n".join(filter(None, (self.preamble, transcript([(user_input, answer)]))))
+            return False
+        self.context, self.preamble = context, None
+        if len(context) <= self.token_budget:
+            return False
+        if self.overflow == "summarize":
+            return True
+        self.truncate()
+        return False
+
+    # Restart from the latest turns that fit in the restart budget
+    def truncate(self):
+        budget = self.token_budget * RESTART_BUDGET_RATIO
+        kept, used = [], 0
+        for user, answer in reversed(self.turns):
+            tokens = self.count_tokens(user) + self.count_tokens(answer)
+            if kept and used + tokens > budget:
+                break
+            kept.insert(0, (user, answer))
+            used += tokens
+        self._restart(transcript(kept), kept)
+
+    # Prompt that asks the model to summarize the turns so far (and its last summary)
+    def summary_prompt(self):
+        text = transcript(self.turns)
+        if self.summary:
+            text = f"Earlier summary: {self.summary}\n{text}"
+        return SUMMARY_PROMPT.format(transcript=text)
+
+    # Restart from a model-written summary (falls back to truncation without one)
+    def summarize(self, summary):
+        if not summary or not summary.strip():
+            self.truncate()
+            return
+        self.summary = summary.strip()
+        self._restart(f"Summary: {self.summary}", [])
+
+    def _restart(self, preamble, turns):
+        self.context = None
+        self.preamble = preamble or None
+        self.turns = list(turns)
+        self.restarts += 1
+
+    def stats(self):
+        return {"context_tokens": len(self.context or ()), "turns": len(self.turns), "restarts": self.restarts}
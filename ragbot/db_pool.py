@@ -0,0 +1,161 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from pgvector.psycopg2 import register_vector
+
+# Pool sizing: POOL_MIN_CONN connections are kept open between turns,
+# at most POOL_MAX_CONN are open at once (further callers wait for a free one)
+POOL_MIN_CONN = 2
+POOL_MAX_CONN = 10
+
+# Connections idle for longer than this are pinged before being handed out
+POOL_HEALTH_CHECK_INTERVAL = 30  # seconds
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+_stats = {
+    "checkouts": 0,
+    "waits": 0,
+    "wait_time_total": 0.0,
+    "checkout_time_total": 0.0,
+    "checkout_time_max": 0.0,
+    "connections_opened": 0,
+    "connections_discarded": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _record(name, value=1):
+    with _stats_lock:
+        _stats[name] += value
+
+
+# Connection pool that registers pgvector once per physical connection
+class VectorConnectionPool(ThreadedConnectionPool):
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        register_vector(conn)
+        conn.commit()
+        self._last_used[id(conn)] = time.monotonic()
+        _record("connections_opened")
+        return conn
+
+    # Ping a connection that sat idle too long
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle_for < POOL_HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # Replace dead connections until one passes the ping. After a database
+    # restart every pooled connection is dead, so this may go through all of
+    # them before a fresh one is opened.
+    def _ensure_healthy(self, conn):
+        for _ in range(self.maxconn):
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+            conn = self.getconn()
+        if self._is_healthy(conn):
+            return conn
+        self._discard(conn)
+        raise psycopg2.OperationalError("No healthy database connection in the pool")
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self.putconn(conn, close=True)
+        _record("connections_discarded")
+
+    # Borrow a connection, blocking while all POOL_MAX_CONN are in use
+    def checkout(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            self._slots.acquire()
+            with _stats_lock:
+                _stats["waits"] += 1
+                _stats["wait_time_total"] += time.perf_counter() - start
+        try:
+            conn = self._ensure_healthy(self.getconn())
+        except Exception:
+            self._slots.release()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            _stats["checkouts"] += 1
+            _stats["checkout_time_total"] += elapsed
+            _stats["checkout_time_max"] = max(_stats["checkout_time_max"], elapsed)
+        return conn
+
+    # Return a borrowed connection; broken ones are closed instead of reused
+    def checkin(self, conn, broken=False):
+        try:
+            if broken or conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self.putconn(conn)
+        finally:
+            self._slots.release()
+
+
+# Get (or lazily create) the pool for a given DB_CONFIG
+def get_pool(db_config):
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = VectorConnectionPool(POOL_MIN_CONN, POOL_MAX_CONN, **db_config)
+            _pools[key] = pool
+        return pool
+
+
+# Borrow a pooled connection for the duration of a with-block
+@contextmanager
+def connection(db_config):
+    pool = get_pool(db_config)
+    conn = pool.checkout()
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        pool.checkin(conn, broken=True)
+        raise
+    except Exception:
+        pool.checkin(conn)
+        raise
+    else:
+        pool.checkin(conn)
+
+
+# Snapshot of pool counters, including average checkout latency
+def get_pool_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    checkouts = stats["checkouts"]
+    stats["checkout_time_avg"] = stats["checkout_time_total"] / checkouts if checkouts else 0.0
+    return stats
+
+
+# Close every pooled connection (call on shutdown)
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+from . import metrics, ollama_embed
+
+# Coalesce embedding requests from concurrent chat turns into multi-input embed calls
+USE_EMBED_BATCHER = True
+
+# How long the first request of a batch waits for others to join it, and the
+# batch size that sends it right away
+EMBED_BATCH_WINDOW_SECONDS = 0.005
+EMBED_MAX_BATCH = ollama_embed.EMBED_BATCH_SIZE
+
+
+# Micro-batching scheduler for single-text embeddings. Requests arriving within
+# `window` seconds of the first one (or until max_batch are waiting) go to
+# Ollama as one /embed call and each caller gets its own vector back. Cached
+# texts are answered immediately without joining a batch; the batch itself
+# skips the cache lookup (every text in it already missed) and only writes
+# the new vectors back.
+class EmbeddingBatcher:
+    def __init__(self, client, api_url, model, window=EMBED_BATCH_WINDOW_SECONDS, max_batch=EMBED_MAX_BATCH):
+        self.client = client
+        self.api_url = api_url
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []          # (text, future, enqueued at)
+        self._timer = None
+        self._inflight = set()
+        self._stats = {"requests": 0, "batches": 0, "batched_texts": 0, "max_batch": 0, "wait_seconds": 0.0}
+
+    # Embed one text; returns the vector, or None when embedding failed. The
+    # cache is checked in a worker thread since a miss in memory reads from disk.
+    async def embed(self, text):
+        self._stats["requests"] += 1
+        cached = await asyncio.to_thread(ollama_embed.cached_embedding, self.model, text)
+        if cached is not None:
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    # Send everything waiting as one batch
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch):
+        sent = time.perf_counter()
+        waited = sum(sent - enqueued for _, _, enqueued in batch)
+        self._stats["batches"] += 1
+        self._stats["batched_texts"] += len(batch)
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+        self._stats["wait_seconds"] += waited
+        metrics.count("embed_batches_total")
+        metrics.count("embed_batched_texts_total", len(batch))
+        for _, _, enqueued in batch:
+            metrics.observe("embed_queue_wait", sent - enqueued)
+
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await ollama_embed.embed_texts_async(
+                self.client, self.api_url, self.model, texts, use_cache=False
+            )
+            await asyncio.to_thread(ollama_embed.cache_embeddings, self.model, texts, embeddings)
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for index, (_, future, _) in enumerate(batch):
+            if not future.done():
+                future.set_result(embeddings[index] if embeddings else None)
+
+    # Send what is still waiting and wait for all batches to finish
+    async def close(self):
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def stats(self):
+        stats = dict(self._stats)
+        batches, requests = stats["batches"], stats["requests"]
+        stats["mean_batch"] = stats["batched_texts"] / batches if batches else 0.0
+        stats["mean_wait_ms"] = stats.pop("wait_seconds") * 1000 / stats["batched_texts"] if stats["batched_texts"] else 0.0
+        stats["cache_hits"] = requests - stats["batched_texts"] - len(self._pending)
+        return stats
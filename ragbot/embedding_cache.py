@@ -0,0 +1,154 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# In-memory LRU tier size (number of embeddings)
+EMBEDDING_CACHE_MEMORY_ITEMS = 4096
+
+# On-disk tier location and size bound; least recently used rows are evicted first
+EMBEDDING_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "chatbot", "embeddings.sqlite3")
+EMBEDDING_CACHE_DISK_BYTES = 1024 * 1024 * 1024
+
+
+# Cache key: model name plus a hash of the exact text
+def cache_key(model, text):
+    return model, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Two-tier (memory LRU + SQLite) cache of embeddings keyed by (model, text hash)
+class EmbeddingCache:
+    def __init__(self, path=EMBEDDING_CACHE_PATH, memory_items=EMBEDDING_CACHE_MEMORY_ITEMS,
+                 disk_bytes=EMBEDDING_CACHE_DISK_BYTES):
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS embedding_cache_lru ON embedding_cache (last_used)")
+        self._db.commit()
+        self._disk_used = self._db.execute(
+            "SELECT COALESCE(SUM(length(embedding)), 0) FROM embedding_cache"
+        ).fetchone()[0]
+
+    def _remember(self, key, embedding):
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # Look up several texts; returns {text: embedding} for the ones that are cached
+    def get_many(self, model, texts):
+        found = {}
+        with self._lock:
+            disk_lookups = {}
+            for text in texts:
+                key = cache_key(model, text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                    self._stats["memory_hits"] += 1
+                else:
+                    disk_lookups[key[1]] = text
+
+            if disk_lookups:
+                now = time.time()
+                for text_hash, text in disk_lookups.items():
+                    row = self._db.execute(
+                        "SELECT embedding FROM embedding_cache WHERE model = ? AND text_hash = ?",
+                        (model, text_hash)
+                    ).fetchone()
+                    if row is None:
+                        self._stats["misses"] += 1
+                        continue
+                    embedding = array("f", row[0]).tolist()
+                    self._remember((model, text_hash), embedding)
+                    self._db.execute(
+                        "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND text_hash = ?",
+                        (now, model, text_hash)
+                    )
+                    found[text] = embedding
+                    self._stats["disk_hits"] += 1
+                self._db.commit()
+        return found
+
+    # Store {text: embedding} pairs in both tiers
+    def put_many(self, model, embeddings):
+        with self._lock:
+            now = time.time()
+            for text, embedding in embeddings.items():
+                key = cache_key(model, text)
+                self._remember(key, embedding)
+                blob = array("f", embedding).tobytes()
+                old = self._db.execute(
+                    "SELECT length(embedding) FROM embedding_cache WHERE model = ? AND text_hash = ?", key
+                ).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embedding_cache (model, text_hash, embedding, last_used) VALUES (?, ?, ?, ?)",
+                    (model, key[1], blob, now)
+                )
+                self._disk_used += len(blob) - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    # Drop least recently used rows until the disk tier fits its bound again
+    def _evict(self):
+        while self._disk_used > self.disk_bytes:
+            rows = self._db.execute(
+                "SELECT model, text_hash, length(embedding) FROM embedding_cache ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._disk_used = 0
+                return
+            for model, text_hash, size in rows:
+                self._db.execute(
+                    "DELETE FROM embedding_cache WHERE model = ? AND text_hash = ?", (model, text_hash)
+                )
+                self._memory.pop((model, text_hash), None)
+                self._disk_used -= size
+                self._stats["evictions"] += 1
+                if self._disk_used <= self.disk_bytes:
+                    return
+
+    # Hit/miss counters plus current tier sizes
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_used
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# Process-wide cache shared by all embedding helpers
+def get_default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
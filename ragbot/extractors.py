@@ -0,0 +1,144 @@
+import codecs
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# pandas, PyPDF2 and pdfminer take hundreds of milliseconds to import, so they
+# are imported on first use rather than when the chatbot starts
+# PDFs with at least this many pages are extracted in a process pool
+PARALLEL_PDF_MIN_PAGES = 32
+PDF_PAGES_PER_TASK = 8
+PDF_WORKERS = os.cpu_count() or 1
+
+# How worker processes (here and in bulk ingest) are started. Not "fork": files
+# are extracted while the ingest writer thread, the event loop and the HTTP
+# connection pools are running, and a forked child can inherit a lock some
+# other thread was holding.
+WORKER_START_METHOD = "spawn"
+
+# Text files are read and decoded this many bytes at a time
+TEXT_BLOCK_BYTES = 1024 * 1024
+
+# Text without a space is buffered up to this many characters, then passed on as it is
+MAX_WORD_CHARS = 64 * 1024
+
+# CSV files are read this many rows at a time, so memory stays flat however large they are
+CSV_CHUNK_ROWS = 10000
+
+
+# Process pool whose workers are started with WORKER_START_METHOD
+def process_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD))
+
+
+def _extract_pypdf2_range(file_path, start, stop, strict):
+    from PyPDF2 import PdfReader
+    reader = PdfReader(file_path, strict=strict)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+# pdfminer ends every page with a form feed
+def _extract_pdfminer_range(file_path, start, stop, strict):
+    from pdfminer.high_level import extract_text
+    return extract_text(file_path, page_numbers=range(start, stop)).split("\f")
+
+
+# Yield the text of each PDF page in order. Large PDFs are split into page ranges
+# that worker processes extract, at most 2 * workers ranges ahead of the consumer.
+def iter_pdf_pages(file_path, strict=False, engine="pypdf2", workers=PDF_WORKERS):
+    from PyPDF2 import PdfReader
+    extract_range = _extract_pdfminer_range if engine == "pdfminer" else _extract_pypdf2_range
+    reader = PdfReader(file_path, strict=strict)
+    page_count = len(reader.pages)
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+
+    if workers <= 1 or page_count < PARALLEL_PDF_MIN_PAGES:
+        if engine == "pypdf2":
+            for page in reader.pages:
+                text = page.extract_text()
+                if text:
+                    yield text
+        else:
+            for start, stop in ranges:
+                yield from filter(None, extract_range(file_path, start, stop, strict))
+        return
+
+    with process_pool(workers) as pool:
+        window = deque()
+        for start, stop in ranges:
+            window.append(pool.submit(extract_range, file_path, start, stop, strict))
+            if len(window) >= workers * 2:
+                yield from filter(None, window.popleft().result())
+        while window:
+            yield from filter(None, window.popleft().result())
+
+
+# Yield the text of a UTF-8 file in pieces of about block_size bytes without
+# reading it whole, decoding incrementally (a multi-byte character split
+# across two blocks is completed from the next one) and translating line
+# endings like a text-mode read. Pieces are cut at a plain space, which is
+# left out, so " ".join(pieces) (as the chunkers do) gives back the exact text
+# of the file. Only a run of more than MAX_WORD_CHARS characters without a
+# space is passed on as it is, gaining a space where it is joined.
+def iter_text_blocks(file_path, block_size=TEXT_BLOCK_BYTES, errors="strict"):
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors=errors), translate=True)
+    carry, cut_at_space = "", False
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            text = carry + decoder.decode(block)
+            cut = text.rfind(" ")
+            if cut >= 0:
+                piece, carry, cut_at_space = text[:cut], text[cut + 1:], True
+            elif len(text) <= MAX_WORD_CHARS:
+                carry = text
+                continue
+            else:
+                piece, carry, cut_at_space = text, "", False
+            yield piece
+        carry += decoder.decode(b"", final=True)
+    # After a cut at a space the rest follows even when empty, so the space comes back
+    if carry or cut_at_space:
+        yield carry
+
+
+# One CSV row as compact "header: value" pairs; empty cells are left out and
+# whitespace inside values (including line breaks) is collapsed
+def format_csv_row(headers, values):
+    return ", ".join(f"{header}: {' '.join(value.split())}" for header, value in zip(headers, values) if value.strip())
+
+
+# Yield (row_number, row_text) for every non-empty data row of a CSV file,
+# numbered from 1 after the header row, reading CSV_CHUNK_ROWS rows at a time
+def iter_csv_rows(file_path, chunk_rows=CSV_CHUNK_ROWS):
+    import pandas as pd
+    number = 0
+    reader = pd.read_csv(file_path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    with reader:
+        for frame in reader:
+            headers = [str(header).strip() for header in frame.columns]
+            for values in frame.itertuples(index=False, name=None):
+                number += 1
+                text = format_csv_row(headers, values)
+                if text:
+                    yield number, text
+
+
+# Lowercased extension of a path (".pdf" for "Manual.PDF")
+def file_extension(file_path):
+    return os.path.splitext(file_path)[1].lower()
+
+
+# Yield the text of a local file piece by piece (one piece per page for PDFs)
+def iter_file_text(file_path, strict=False, pdf_engine="pypdf2", pdf_workers=PDF_WORKERS):
+    extension = file_extension(file_path)
+    if extension == ".txt":
+        yield from iter_text_blocks(file_path)
+    elif extension == ".pdf":
+        yield from iter_pdf_pages(file_path, strict=strict, engine=pdf_engine, workers=pdf_workers)
+    elif extension == ".csv":
+        # One piece per row; process_file chunks CSVs with iter_csv_rows instead
+        for _, text in iter_csv_rows(file_path):
+            yield text
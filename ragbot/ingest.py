@@ -0,0 +1,152 @@
+import hashlib
+import time
+import uuid
+from itertools import islice
+
+from . import answer_cache, chunking, metrics
+from .ollama_embed import EMBED_BATCH_SIZE
+
+
+# Split any iterable into lists of at most batch_size items
+def batched(items, batch_size):
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Hash a file's bytes without reading it into memory at once
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Compare a source with its manifest entry. A matching mtime skips hashing,
+# otherwise compute_hash() decides; sources chunked with different settings
+# (chunker is the chunking signature, the text one by default) always count as
+# changed. Returns (unchanged, content_hash).
+def check_manifest(store, source, mtime, compute_hash, chunker=None):
+    manifest = store.get_manifest(source)
+    if manifest and manifest["chunker"] != (chunker or chunking.chunking_signature()):
+        manifest = None
+    if manifest and mtime is not None and manifest["mtime"] == mtime:
+        return True, manifest["content_hash"]
+
+    content_hash = compute_hash()
+    unchanged = manifest is not None and manifest["content_hash"] == content_hash
+    if unchanged and mtime is not None:
+        store.touch_manifest(source, mtime)
+    return unchanged, content_hash
+
+
+# Checkpoint to continue from: the source's unfinished job if it was for the
+# same content and chunking, otherwise a new job starting before chunk 0
+def resume_checkpoint(store, source, content_hash, chunker):
+    checkpoint = store.get_checkpoint(source)
+    if (checkpoint and checkpoint["content_hash"] == content_hash
+            and checkpoint["chunker"] == chunker):
+        return checkpoint
+    return {"source": source, "job_id": uuid.uuid4().hex, "content_hash": content_hash,
+            "chunker": chunker, "chunk_index": -1}
+
+
+# Embed chunks in batches and write each batch in one store call. Chunks are
+# texts or (text, location) pairs. With a source, chunks already stored for it
+# are skipped and chunks that disappeared are deleted, and every batch commits
+# a checkpoint (the index of the last chunk stored so far) along with its rows:
+# a job that was interrupted resumes after that chunk without looking at the
+# chunks before it again. Once a batch fails the checkpoint stops advancing,
+# so the chunks it lost are retried by the next run.
+@metrics.timed("ingest")
+def ingest_chunks(chunks, embed_batch, store, batch_size=EMBED_BATCH_SIZE,
+                  source=None, content_hash=None, mtime=None, chunker=None):
+    stats = {"chunks": 0, "stored": 0, "unchanged": 0, "resumed": 0, "removed": 0, "failed": 0,
+             "seconds": 0.0, "job_id": None}
+    start = time.perf_counter()
+    chunker = chunker or chunking.chunking_signature()
+    stored_hashes = store.chunk_hashes(source) if source else set()
+    checkpoint = resume_checkpoint(store, source, content_hash, chunker) if source else None
+    resume_after = checkpoint["chunk_index"] if checkpoint else -1
+    if checkpoint:
+        stats["job_id"] = checkpoint["job_id"]
+    seen_hashes = []
+    seen = set()
+
+    def pending_chunks():
+        for index, chunk in enumerate(chunks):
+            stats["chunks"] += 1
+            chunk, location = chunk if isinstance(chunk, tuple) else (chunk, None)
+            chunk_hash = hash_text(chunk)
+            if chunk_hash in seen:
+                continue
+            seen.add(chunk_hash)
+            seen_hashes.append(chunk_hash)
+            if index <= resume_after:
+                stats["resumed"] += 1
+                continue
+            if chunk_hash in stored_hashes:
+                stats["unchanged"] += 1
+                continue
+            yield index, chunk, chunk_hash, location
+
+    for batch in batched(pending_chunks(), batch_size):
+        texts = [chunk for _, chunk, _, _ in batch]
+        embeddings = embed_batch(texts)
+        if not embeddings:
+            stats["failed"] += len(batch)
+            continue
+
+        checkpoints = None
+        if checkpoint and not stats["failed"]:
+            checkpoint = dict(checkpoint, chunk_index=batch[-1][0])
+            checkpoints = [checkpoint]
+        store.add([(chunk, embedding, source, chunk_hash, location)
+                   for (_, chunk, chunk_hash, location), embedding in zip(batch, embeddings)],
+                  checkpoints=checkpoints)
+        stats["stored"] += len(batch)
+
+    if source and stats["chunks"]:
+        # A partially embedded source is not recorded, so the next run retries it
+        removed = stored_hashes - seen
+        manifest = None
+        if not stats["failed"]:
+            manifest = {
+                "content_hash": content_hash,
+                "mtime": mtime,
+                "chunk_hashes": seen_hashes,
+                "chunker": chunker,
+            }
+        store.finish_source(source, removed, manifest)
+        stats["removed"] = len(removed)
+
+    if stats["stored"] or stats["removed"]:
+        # Cached answers may rely on documents that just changed
+        answer_cache.invalidate_default_cache()
+    metrics.count("chunks_stored_total", stats["stored"])
+    metrics.count("chunks_failed_total", stats["failed"])
+    stats["seconds"] = time.perf_counter() - start
+    stats["chunks_per_second"] = stats["stored"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+# Summarize an ingest_chunks run on the console
+def print_ingest_report(console, stats):
+    if stats["resumed"]:
+        console.print(f"[bold yellow]Resumed job {stats['job_id']}:[/bold yellow] "
+                      f"{stats['resumed']} chunks were already stored by an earlier run.")
+    if stats["failed"]:
+        console.print(f"[bold red]Error:[/bold red] {stats['failed']} of {stats['chunks']} chunks could not be embedded.")
+    console.print(
+        f"[bold green]File processed successfully. Embedded {stats['stored']} new chunks, "
+        f"skipped {stats['unchanged']} unchanged, removed {stats['removed']} stale "
+        f"({stats['chunks_per_second']:.1f} chunks/s).[/bold green]"
+    )
@@ -0,0 +1,171 @@
+import atexit
+import functools
+import inspect
+import threading
+import time
+
+# Latency histogram bucket bounds in seconds (Prometheus-style cumulative buckets)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRIC_PREFIX = "chatbot"
+
+# Nothing is recorded until enable() is called; instrumented code then only pays
+# for a flag check
+_enabled = False
+_lock = threading.Lock()
+_histograms = {}    # stage -> [bucket counts..., +Inf count, sum]
+_counters = {}      # (name, sorted label items) -> value
+_gauges = {}        # name -> callback returning the current value
+_server = None
+
+
+def enabled():
+    return _enabled
+
+
+# Record one latency observation for a pipeline stage
+def observe(stage, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram[index] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+
+# Add to a counter, e.g. count("bytes_received", 512, stage="embed")
+def count(name, amount=1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+# Register a gauge whose value is read from callback when metrics are exported
+def gauge(name, callback):
+    _gauges[name] = callback
+
+
+# Decorator timing every call of a (sync or async) function as `stage`, and
+# counting its calls and errors
+def timed(stage):
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                except Exception:
+                    count("errors_total", stage=stage)
+                    raise
+                finally:
+                    count("calls_total", stage=stage)
+                    observe(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                count("errors_total", stage=stage)
+                raise
+            finally:
+                count("calls_total", stage=stage)
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _labels(items):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}" if items else ""
+
+
+# Current metrics in the Prometheus text exposition format
+def render():
+    lines = []
+    with _lock:
+        histograms = {stage: list(values) for stage, values in _histograms.items()}
+        counters = dict(_counters)
+
+    name = f"{METRIC_PREFIX}_stage_seconds"
+    if histograms:
+        lines.append(f"# TYPE {name} histogram")
+    for stage, values in sorted(histograms.items()):
+        for bound, value in zip(LATENCY_BUCKETS, values):
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {value}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {values[-2]}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {values[-2]}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {values[-1]:.6f}')
+
+    typed = set()
+    for (counter, labels), value in sorted(counters.items()):
+        name = f"{METRIC_PREFIX}_{counter}"
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_labels(labels)} {value}")
+
+    for gauge_name, callback in sorted(_gauges.items()):
+        try:
+            value = callback()
+        except Exception:
+            continue
+        name = f"{METRIC_PREFIX}_{gauge_name}"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Serve /metrics on localhost from a daemon thread (http.server is only
+# imported when the endpoint is actually used)
+def serve(port):
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    _server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def dump(path):
+    with open(path, "w") as f:
+        f.write(render())
+
+
+# Start recording; optionally serve the endpoint and write the metrics to dump_path at exit
+def enable(port=None, dump_path=None):
+    global _enabled
+    _enabled = True
+    if port is not None and _server is None:
+        serve(port)
+    if dump_path:
+        atexit.register(dump, dump_path)
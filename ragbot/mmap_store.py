@@ -0,0 +1,382 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from . import metrics
+from .vector_store import VectorStore
+
+# On-disk vector precision: "float16" halves the file size, "float32" keeps full precision
+MMAP_STORE_DTYPE = "float16"
+
+# Vectors are scored in blocks of about this many bytes (as float32)
+MMAP_SEARCH_BLOCK_BYTES = 64 * 1024 * 1024
+
+# First-pass search on compact codes: None (score the stored vectors directly),
+# "int8" (scalar quantization, 1 byte per dimension) or "binary" (sign bits,
+# 1 bit per dimension). The best limit * MMAP_RESCORE_FACTOR candidates are then
+# rescored exactly against the full-precision vectors.
+MMAP_QUANTIZATION = None
+MMAP_RESCORE_FACTOR = 8
+
+_HEADER = "header.json"
+_VECTORS = "vectors.bin"
+_RECORDS = "records.jsonl"
+_OFFSETS = "offsets.bin"
+_DELETED = "deleted.bin"
+_MANIFEST = "manifest.json"
+_CHECKPOINTS = "checkpoints.json"
+_CODES = "codes.bin"
+_SCALES = "scales.bin"
+_NORMS = "norms.bin"
+
+# Number of set bits in every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+
+# Compact codes for a block of float32 vectors: (codes, per-row scales, squared norms)
+def quantize(vectors, quantization):
+    norms = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+    if quantization == "int8":
+        scales = (np.abs(vectors).max(axis=1) / 127).astype(np.float32)
+        safe = np.where(scales == 0, 1, scales)[:, None]
+        codes = np.clip(np.rint(vectors / safe), -127, 127).astype(np.int8)
+        return codes, scales, norms
+    if quantization == "binary":
+        return np.packbits(vectors > 0, axis=1), None, norms
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+# Write to a temporary file and rename it over the old one, so a crash never
+# leaves a half-written file
+def _write_json(path, data):
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+# Embedded backend: an append-only memory-mapped matrix of vectors, a JSON-lines
+# sidecar with each row's text/source/chunk hash/location, and (offset, length) pairs
+# locating each record. Rows are deleted by appending their ids to a tombstone
+# file. Nothing is loaded into RAM on open; searches scan the mapping (or the
+# quantized codes, see MMAP_QUANTIZATION) in blocks.
+# Meant for a single process; appends are serialized with a lock.
+class MmapVectorStore(VectorStore):
+    backend = "mmap"
+
+    def __init__(self, path, dim, dtype=MMAP_STORE_DTYPE, quantization=MMAP_QUANTIZATION,
+                 rescore_factor=MMAP_RESCORE_FACTOR):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._vectors = np.empty((0, dim), dtype=self.dtype)
+        self._offsets = np.empty((0, 2), dtype=np.uint64)
+        self._deleted = np.empty(0, dtype=np.uint64)
+        self._codes = self._scales = self._norms = None
+        self._manifest = None
+        self._checkpoints = None
+        self._sources = None    # source -> {chunk_hash: [row ids]} of live rows, see _source_index
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def setup(self):
+        os.makedirs(self.path, exist_ok=True)
+        header_path = self._file(_HEADER)
+        header = {"dim": self.dim, "dtype": self.dtype.name, "quantization": None}
+        if os.path.exists(header_path):
+            with open(header_path, "r") as f:
+                header.update(json.load(f))
+            if header["dim"] != self.dim:
+                raise ValueError(f"Vector store at {self.path} holds {header['dim']}-dim vectors, not {self.dim}")
+            self.dtype = np.dtype(header["dtype"])
+
+        for name in (_VECTORS, _RECORDS, _OFFSETS, _DELETED, _CODES, _SCALES, _NORMS):
+            open(self._file(name), "ab").close()
+        with self._lock:
+            self._repair()
+            if header["quantization"] != self.quantization:
+                self._rebuild_codes()
+                header["quantization"] = self.quantization
+            with open(header_path, "w") as f:
+                json.dump(header, f)
+            self._refresh()
+
+    # The offsets file is written last, so it decides how many rows exist;
+    # anything a crash left beyond that in the other files is cut off
+    def _repair(self):
+        rows = os.path.getsize(self._file(_OFFSETS)) // 16
+        os.truncate(self._file(_OFFSETS), rows * 16)
+        os.truncate(self._file(_VECTORS), rows * self.dim * self.dtype.itemsize)
+        end = 0
+        if rows:
+            start, length = np.fromfile(self._file(_OFFSETS), dtype=np.uint64, offset=(rows - 1) * 16)
+            end = int(start + length)
+        os.truncate(self._file(_RECORDS), end)
+        if self.quantization:
+            os.truncate(self._file(_CODES), rows * self._code_bytes())
+            os.truncate(self._file(_SCALES), rows * 4 if self.quantization == "int8" else 0)
+            os.truncate(self._file(_NORMS), rows * 4)
+
+    def _code_bytes(self):
+        return self.dim if self.quantization == "int8" else (self.dim + 7) // 8
+
+    def _block_rows(self):
+        return max(1, MMAP_SEARCH_BLOCK_BYTES // (self.dim * 4))
+
+    # Recompute the codes of every stored vector (quantization setting changed)
+    def _rebuild_codes(self):
+        for name in (_CODES, _SCALES, _NORMS):
+            os.truncate(self._file(name), 0)
+        if not self.quantization:
+            return
+        rows = os.path.getsize(self._file(_OFFSETS)) // 16
+        if not rows:
+            return
+        vectors = np.memmap(self._file(_VECTORS), dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        for start in range(0, rows, self._block_rows()):
+            block = np.asarray(vectors[start:start + self._block_rows()], dtype=np.float32)
+            self._append_codes(*quantize(block, self.quantization))
+
+    def _append_codes(self, codes, scales, norms):
+        with open(self._file(_CODES), "ab") as f:
+            f.write(codes.tobytes())
+        if scales is not None:
+            with open(self._file(_SCALES), "ab") as f:
+                f.write(scales.tobytes())
+        with open(self._file(_NORMS), "ab") as f:
+            f.write(norms.tobytes())
+
+    def _refresh(self):
+        self._rows = os.path.getsize(self._file(_OFFSETS)) // 16
+        if self._rows:
+            self._vectors = np.memmap(self._file(_VECTORS), dtype=self.dtype, mode="r", shape=(self._rows, self.dim))
+            self._offsets = np.memmap(self._file(_OFFSETS), dtype=np.uint64, mode="r", shape=(self._rows, 2))
+            if self.quantization:
+                code_dtype = np.int8 if self.quantization == "int8" else np.uint8
+                self._codes = np.memmap(self._file(_CODES), dtype=code_dtype, mode="r",
+                                        shape=(self._rows, self._code_bytes()))
+                self._norms = np.memmap(self._file(_NORMS), dtype=np.float32, mode="r", shape=(self._rows,))
+                if self.quantization == "int8":
+                    self._scales = np.memmap(self._file(_SCALES), dtype=np.float32, mode="r", shape=(self._rows,))
+        self._deleted = np.unique(np.fromfile(self._file(_DELETED), dtype=np.uint64))
+
+    # Checkpoints are saved right after the offsets commit the rows; a crash in
+    # between leaves a checkpoint one batch behind, and those chunks are then
+    # skipped by their hashes rather than stored twice
+    @metrics.timed("vector_insert")
+    def add(self, rows, checkpoints=None):
+        if not rows:
+            return
+        vectors = np.asarray([row[1] for row in rows], dtype=self.dtype)
+        if vectors.shape != (len(rows), self.dim):
+            raise ValueError(f"Expected {self.dim}-dim embeddings, got shape {vectors.shape}")
+        records = [
+            (json.dumps({"text": text, "source": source, "chunk_hash": chunk_hash, "location": location})
+             + "\n").encode("utf-8")
+            for text, _, source, chunk_hash, location in rows
+        ]
+
+        with self._lock:
+            first_row = self._rows
+            position = os.path.getsize(self._file(_RECORDS))
+            offsets = []
+            for record in records:
+                offsets.append((position, len(record)))
+                position += len(record)
+
+            with open(self._file(_VECTORS), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file(_RECORDS), "ab") as f:
+                f.write(b"".join(records))
+            if self.quantization:
+                self._append_codes(*quantize(vectors.astype(np.float32), self.quantization))
+            with open(self._file(_OFFSETS), "ab") as f:
+                f.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+            self._refresh()
+            if self._sources is not None:
+                for row_id, (_, _, source, chunk_hash, _) in enumerate(rows, first_row):
+                    if source is not None:
+                        self._sources.setdefault(source, {}).setdefault(chunk_hash, []).append(row_id)
+            if checkpoints:
+                saved = self._load_checkpoints()
+                for checkpoint in checkpoints:
+                    saved[checkpoint["source"]] = dict(checkpoint)
+                self._save_checkpoints()
+
+    def _read_records(self, row_ids, offsets):
+        records = []
+        with open(self._file(_RECORDS), "rb") as f:
+            for row_id in row_ids:
+                start, length = offsets[row_id]
+                f.seek(int(start))
+                records.append(json.loads(f.read(int(length))))
+        return records
+
+    # Ids and scores of the `keep` lowest-scoring live rows, scanning one block at a time
+    def _scan(self, rows, deleted, keep, score_block, block_rows):
+        best_ids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, rows, block_rows):
+            stop = min(start + block_rows, rows)
+            scores = score_block(start, stop).astype(np.float32)
+            gone = deleted[(deleted >= start) & (deleted < stop)].astype(np.int64) - start
+            scores[gone] = np.inf
+
+            ids = np.concatenate([best_ids, np.arange(start, stop)])
+            scores = np.concatenate([best_scores, scores])
+            if len(scores) > keep:
+                selected = np.argpartition(scores, keep - 1)[:keep]
+                ids, scores = ids[selected], scores[selected]
+            best_ids, best_scores = ids, scores
+
+        live = np.isfinite(best_scores)
+        return best_ids[live], best_scores[live]
+
+    # Brute-force L2 top-k over the mapped vectors, or over the compact codes
+    # followed by exact rescoring of the best candidates
+    @metrics.timed("vector_search")
+    def search(self, query_embedding, limit):
+        with self._lock:
+            rows, vectors, offsets, deleted = self._rows, self._vectors, self._offsets, self._deleted
+            codes, scales, norms = self._codes, self._scales, self._norms
+        if not rows or limit <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        # ||v - q||^2 without the constant ||q||^2 term
+        def exact_scores(start, stop):
+            block = np.asarray(vectors[start:stop], dtype=np.float32)
+            return np.einsum("ij,ij->i", block, block) - 2 * (block @ query)
+
+        if not self.quantization:
+            ids, scores = self._scan(rows, deleted, limit, exact_scores, self._block_rows())
+        else:
+            if self.quantization == "int8":
+                def code_scores(start, stop):
+                    block = np.asarray(codes[start:stop], dtype=np.float32)
+                    return norms[start:stop] - 2 * scales[start:stop] * (block @ query)
+                block_rows = self._block_rows()
+            else:
+                query_bits = np.packbits(query > 0)
+
+                def code_scores(start, stop):
+                    return _POPCOUNT[np.bitwise_xor(codes[start:stop], query_bits)].sum(axis=1)
+                block_rows = max(1, MMAP_SEARCH_BLOCK_BYTES // (self._code_bytes() * 2))
+
+            candidates, _ = self._scan(rows, deleted, limit * self.rescore_factor, code_scores, block_rows)
+            candidates = np.sort(candidates)
+            full = np.asarray(vectors[candidates], dtype=np.float32)
+            scores = np.einsum("ij,ij->i", full, full) - 2 * (full @ query)
+            keep = np.argsort(scores)[:limit]
+            ids, scores = candidates[keep], scores[keep]
+
+        order = np.argsort(scores)
+        ids, scores = ids[order], scores[order]
+        distances = np.sqrt(np.maximum(scores + query @ query, 0))
+        records = self._read_records(ids, offsets)
+        return [
+            (record["text"], np.asarray(vectors[row_id], dtype=np.float32), float(distance))
+            for record, row_id, distance in zip(records, ids, distances)
+        ]
+
+    # Live rows of every source, by chunk hash. Built with one pass over the
+    # records on first use, then kept up to date by add() and finish_source(),
+    # so ingesting a file does not rescan the whole store. Call with the lock held.
+    def _source_index(self):
+        if self._sources is None:
+            sources = {}
+            deleted = set(self._deleted.tolist())
+            with open(self._file(_RECORDS), "rb") as f:
+                for row_id in range(self._rows):
+                    line = f.readline()
+                    if row_id in deleted:
+                        continue
+                    record = json.loads(line)
+                    if record["source"] is not None:
+                        sources.setdefault(record["source"], {}).setdefault(record["chunk_hash"], []).append(row_id)
+            self._sources = sources
+        return self._sources
+
+    def chunk_hashes(self, source):
+        with self._lock:
+            return set(self._source_index().get(source, ()))
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            self._manifest = _read_json(self._file(_MANIFEST))
+        return self._manifest
+
+    def _save_manifest(self):
+        _write_json(self._file(_MANIFEST), self._manifest)
+
+    def _load_checkpoints(self):
+        if self._checkpoints is None:
+            self._checkpoints = _read_json(self._file(_CHECKPOINTS))
+        return self._checkpoints
+
+    def _save_checkpoints(self):
+        _write_json(self._file(_CHECKPOINTS), self._checkpoints)
+
+    def get_manifest(self, source):
+        with self._lock:
+            entry = self._load_manifest().get(source)
+        return dict(entry) if entry else None
+
+    def touch_manifest(self, source, mtime):
+        with self._lock:
+            manifest = self._load_manifest()
+            if source in manifest:
+                manifest[source]["mtime"] = mtime
+                self._save_manifest()
+
+    def finish_source(self, source, removed_hashes, manifest=None):
+        removed_hashes = set(removed_hashes)
+        if removed_hashes:
+            with self._lock:
+                chunks = self._source_index().get(source, {})
+                row_ids = [row_id for chunk_hash in removed_hashes for row_id in chunks.pop(chunk_hash, ())]
+                if not chunks:
+                    self._sources.pop(source, None)
+                with open(self._file(_DELETED), "ab") as f:
+                    f.write(np.asarray(row_ids, dtype=np.uint64).tobytes())
+                self._refresh()
+        if manifest is not None:
+            with self._lock:
+                self._load_manifest()[source] = dict(manifest)
+                self._save_manifest()
+                if self._load_checkpoints().pop(source, None) is not None:
+                    self._save_checkpoints()
+
+    def get_checkpoint(self, source):
+        with self._lock:
+            checkpoint = self._load_checkpoints().get(source)
+        return dict(checkpoint) if checkpoint else None
+
+    def stats(self):
+        with self._lock:
+            rows, deleted = self._rows, len(self._deleted)
+        size = sum(os.path.getsize(self._file(name))
+                   for name in (_VECTORS, _RECORDS, _OFFSETS, _DELETED, _CODES, _SCALES, _NORMS))
+        return {
+            "backend": self.backend,
+            "rows": rows - deleted,
+            "deleted_rows": deleted,
+            "dtype": self.dtype.name,
+            "quantization": self.quantization or "none",
+            "size_mb": round(size / 1024 / 1024, 1),
+        }
@@ -0,0 +1,96 @@
+import asyncio
+
+from . import metrics, transport
+from .embedding_cache import get_default_cache
+
+# Number of chunks sent to Ollama per embed call during ingestion
+EMBED_BATCH_SIZE = 32
+
+# Serve repeated texts from the embedding cache instead of calling Ollama again
+USE_EMBEDDING_CACHE = True
+
+
+# Split texts into cached embeddings and the de-duplicated texts still to embed
+def _lookup(model, texts, use_cache):
+    if not (USE_EMBEDDING_CACHE if use_cache is None else use_cache):
+        return None, list(dict.fromkeys(texts))
+    found = get_default_cache().get_many(model, texts)
+    return found, list(dict.fromkeys(text for text in texts if text not in found))
+
+
+# Cached embedding of a single text, or None (also when the cache is turned off)
+def cached_embedding(model, text):
+    if not USE_EMBEDDING_CACHE:
+        return None
+    return get_default_cache().get_many(model, [text]).get(text)
+
+
+# Store freshly generated embeddings of texts (when the cache is turned on)
+def cache_embeddings(model, texts, embeddings):
+    if USE_EMBEDDING_CACHE and embeddings:
+        get_default_cache().put_many(model, dict(zip(texts, embeddings)))
+
+
+def _count_response(missing, response):
+    metrics.count("embedded_texts_total", len(missing))
+    metrics.count("bytes_received_total", len(response.content), stage="embed")
+    if response.status_code != 200:
+        metrics.count("http_errors_total", stage="embed")
+
+
+# Combine cached and freshly generated embeddings back into input order
+def _merge(model, texts, found, missing, embeddings):
+    if missing and len(embeddings) != len(missing):
+        return []
+    fresh = dict(zip(missing, embeddings))
+    if found is None:
+        found = fresh
+    else:
+        if fresh:
+            get_default_cache().put_many(model, fresh)
+        found.update(fresh)
+    return [found[text] for text in texts]
+
+
+# Generate embeddings for several texts with one call to the multi-input embed endpoint
+@metrics.timed("embed")
+def embed_texts(api_url, model, texts, use_cache=None):
+    texts = list(texts)
+    if not texts:
+        return []
+    found, missing = _lookup(model, texts, use_cache)
+    embeddings = []
+    if missing:
+        # Synchronous calls only happen during ingestion; the chat loop uses httpx
+        import requests
+        try:
+            response = transport.post(f"{api_url}/embed", endpoint="embed", idempotent=True,
+                                      json={"model": model, "input": missing})
+        except requests.RequestException:
+            return []
+        _count_response(missing, response)
+        if response.status_code == 200:
+            embeddings = response.json().get("embeddings", [])
+    return _merge(model, texts, found, missing, embeddings)
+
+
+# Async variant of embed_texts; client is an httpx.AsyncClient. The cache is
+# read and written in a worker thread so its disk I/O does not stall the event loop.
+@metrics.timed("embed")
+async def embed_texts_async(client, api_url, model, texts, use_cache=None):
+    texts = list(texts)
+    if not texts:
+        return []
+    found, missing = await asyncio.to_thread(_lookup, model, texts, use_cache)
+    embeddings = []
+    if missing:
+        import httpx
+        try:
+            response = await transport.request_async(client, "POST", f"{api_url}/embed", endpoint="embed",
+                                                     idempotent=True, json={"model": model, "input": missing})
+        except httpx.HTTPError:
+            return []
+        _count_response(missing, response)
+        if response.status_code == 200:
+            embeddings = response.json().get("embeddings", [])
+    return await asyncio.to_thread(_merge, model, texts, found, missing, embeddings)
@@ -0,0 +1,156 @@
+import inspect
+import json
+import time
+
+from . import metrics, transport
+
+# How long Ollama keeps the model (and a conversation's cached prefix) loaded
+# after a request; None leaves Ollama's default of five minutes
+OLLAMA_KEEP_ALIVE = "30m"
+
+
+# /api/generate request body; context continues an earlier generation
+def _payload(model, prompt, context=None):
+    payload = {"model": model, "prompt": prompt}
+    if context:
+        payload["context"] = context
+    if OLLAMA_KEEP_ALIVE is not None:
+        payload["keep_alive"] = OLLAMA_KEEP_ALIVE
+    return payload
+
+
+# Parse one NDJSON line, updating stats; returns the text fragment it carries
+def _handle_line(line, stats, start):
+    try:
+        json_data = json.loads(line)
+    except json.JSONDecodeError:
+        return ""  # Ignore incomplete JSON errors
+
+    chunk = json_data.get("response", "")
+    if chunk and "first_token_seconds" not in stats:
+        stats["first_token_seconds"] = time.perf_counter() - start
+    if json_data.get("done"):
+        _record_final_frame(stats, json_data)
+    return chunk
+
+
+# Stream a completion from /api/generate, yielding text fragments as they arrive.
+# When a stats dict is passed it is filled with time-to-first-token, the
+# timings from Ollama's final ("done") frame and the "context" token array it
+# returns, which can be passed back as context to continue the conversation.
+def stream_generate(api_url, model, prompt, stats=None, context=None):
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    response = transport.post(
+        f"{api_url}/generate", endpoint="generate",
+        json=_payload(model, prompt, context),
+        stream=True
+    )
+
+    for line in response.iter_lines():
+        if line:
+            chunk = _handle_line(line.decode("utf-8"), stats, start)
+            if chunk:
+                yield chunk
+
+    stats["total_seconds"] = time.perf_counter() - start
+
+
+# Async variant of stream_generate; client is an httpx.AsyncClient
+async def stream_generate_async(client, api_url, model, prompt, stats=None, context=None):
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    response = await transport.stream_async(
+        client, "POST", f"{api_url}/generate", endpoint="generate",
+        json=_payload(model, prompt, context)
+    )
+    try:
+        async for line in response.aiter_lines():
+            if line:
+                chunk = _handle_line(line, stats, start)
+                if chunk:
+                    yield chunk
+    finally:
+        await response.aclose()
+
+    stats["total_seconds"] = time.perf_counter() - start
+
+
+# Ollama reports durations in nanoseconds
+def _record_final_frame(stats, frame):
+    eval_count = frame.get("eval_count", 0)
+    eval_seconds = frame.get("eval_duration", 0) / 1e9
+    prompt_eval_seconds = frame.get("prompt_eval_duration", 0) / 1e9
+    stats["prompt_tokens"] = frame.get("prompt_eval_count", 0)
+    stats["prompt_eval_seconds"] = prompt_eval_seconds
+    stats["eval_tokens"] = eval_count
+    stats["eval_seconds"] = eval_seconds
+    stats["load_seconds"] = frame.get("load_duration", 0) / 1e9
+    stats["tokens_per_second"] = eval_count / eval_seconds if eval_seconds else 0.0
+    if "context" in frame:
+        stats["context"] = frame["context"]
+
+
+# Time-to-first-token and token counts of a finished generation
+def _record_metrics(stats):
+    if "first_token_seconds" in stats:
+        metrics.observe("first_token", stats["first_token_seconds"])
+    if "prompt_eval_seconds" in stats:
+        metrics.observe("prefill", stats["prompt_eval_seconds"])
+        metrics.observe("decode", stats["eval_seconds"])
+    metrics.count("prompt_tokens_total", stats.get("prompt_tokens", 0))
+    metrics.count("generated_tokens_total", stats.get("eval_tokens", 0))
+
+
+# Run a streamed completion, calling on_token for every fragment, and return the full text
+@metrics.timed("generate")
+def generate(api_url, model, prompt, on_token=None, stats=None, context=None):
+    stats = {} if stats is None else stats
+    parts = []
+    for chunk in stream_generate(api_url, model, prompt, stats, context):
+        parts.append(chunk)
+        if on_token is not None:
+            on_token(chunk)
+    _record_metrics(stats)
+    return "".join(parts)
+
+
+# Async variant of generate; on_token may also be a coroutine function, which
+# is awaited so a slow consumer slows down reading the stream
+@metrics.timed("generate")
+async def generate_async(client, api_url, model, prompt, on_token=None, stats=None, context=None):
+    stats = {} if stats is None else stats
+    parts = []
+    async for chunk in stream_generate_async(client, api_url, model, prompt, stats, context):
+        parts.append(chunk)
+        if on_token is not None:
+            result = on_token(chunk)
+            if inspect.isawaitable(result):
+                await result
+    _record_metrics(stats)
+    return "".join(parts)
+
+
+# on_token callback that writes fragments straight to a rich console
+def console_printer(console):
+    def print_token(chunk):
+        console.print(chunk, end="", markup=False, highlight=False)
+    return print_token
+
+
+# One-line summary of a streamed generation
+def print_generation_stats(console, stats):
+    if stats.get("cached"):
+        console.print("[dim]answered from cache[/dim]")
+        return
+    if "first_token_seconds" not in stats:
+        return
+    prefill = ""
+    if "prompt_eval_seconds" in stats:
+        prefill = (f"prefill {stats['prompt_tokens']} tokens in {stats['prompt_eval_seconds']:.2f} s, "
+                   f"decode {stats['eval_tokens']} tokens in {stats['eval_seconds']:.2f} s, ")
+    console.print(
+        f"[dim]first token {stats['first_token_seconds']:.2f} s, {prefill}"
+        f"{stats.get('tokens_per_second', 0.0):.1f} tokens/s, "
+        f"total {stats['total_seconds']:.2f} s[/dim]"
+    )
@@ -0,0 +1,197 @@
+import numpy as np
+from psycopg2.extras import execute_values
+
+from . import db_pool, metrics, vector_index
+from .vector_store import VectorStore
+
+
+# pgvector 0.4+ returns embeddings as pgvector.Vector objects (older releases
+# return ndarrays); retrieval works on plain float32 arrays
+def _as_array(embedding):
+    if hasattr(embedding, "to_numpy"):
+        embedding = embedding.to_numpy()
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def _with_arrays(rows):
+    return [(text, _as_array(embedding), score) for text, embedding, score in rows]
+
+
+# PostgreSQL + pgvector backend; connections come from db_pool
+class PgVectorStore(VectorStore):
+    backend = "pgvector"
+    full_text = True
+
+    def __init__(self, db_config, dim):
+        self.db_config = db_config
+        self.dim = dim
+
+    def connection(self):
+        return db_pool.connection(self.db_config)
+
+    # Embeddings table with its ANN index, per-chunk source columns, the ingest
+    # manifest and checkpoints
+    def setup(self):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            vector_index.create_embeddings_table(cur, self.dim)
+            cur.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS source TEXT")
+            cur.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS chunk_hash TEXT")
+            cur.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS location TEXT")
+            cur.execute("CREATE INDEX IF NOT EXISTS embeddings_source_idx ON embeddings (source, chunk_hash)")
+            vector_index.create_text_search_index(cur)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_manifest (
+                    source TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    mtime DOUBLE PRECISION,
+                    chunk_hashes TEXT[] NOT NULL,
+                    ingested_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            cur.execute("ALTER TABLE ingest_manifest ADD COLUMN IF NOT EXISTS chunker TEXT")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_checkpoint (
+                    source TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    chunker TEXT,
+                    chunk_index INTEGER NOT NULL,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+            vector_index.maintain_ann_index(cur, self.dim)
+            conn.commit()
+
+    # Insert all rows with a single multi-row INSERT; the checkpoints are
+    # upserted in the same transaction
+    @metrics.timed("vector_insert")
+    def add(self, rows, checkpoints=None):
+        if not rows:
+            return
+        with self.connection() as conn:
+            cur = conn.cursor()
+            execute_values(
+                cur,
+                "INSERT INTO embeddings (text, embedding, source, chunk_hash, location) VALUES %s",
+                rows,
+                page_size=len(rows)
+            )
+            for checkpoint in checkpoints or ():
+                cur.execute("""
+                    INSERT INTO ingest_checkpoint (source, job_id, content_hash, chunker, chunk_index)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (source) DO UPDATE SET
+                        job_id = EXCLUDED.job_id,
+                        content_hash = EXCLUDED.content_hash,
+                        chunker = EXCLUDED.chunker,
+                        chunk_index = EXCLUDED.chunk_index,
+                        updated_at = now();
+                """, (checkpoint["source"], checkpoint["job_id"], checkpoint["content_hash"],
+                      checkpoint["chunker"], checkpoint["chunk_index"]))
+            conn.commit()
+
+    @metrics.timed("vector_search")
+    def search(self, query_embedding, limit):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            return _with_arrays(vector_index.search_candidates(cur, query_embedding, self.dim, limit=limit))
+
+    @metrics.timed("lexical_search")
+    def lexical_search(self, query_text, limit):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            return _with_arrays(vector_index.lexical_candidates(cur, query_text, limit=limit))
+
+    def chunk_hashes(self, source):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT DISTINCT chunk_hash FROM embeddings WHERE source = %s", (source,))
+            return {row[0] for row in cur.fetchall()}
+
+    def get_manifest(self, source):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT content_hash, mtime, chunker FROM ingest_manifest WHERE source = %s", (source,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "mtime": row[1], "chunker": row[2]}
+
+    def touch_manifest(self, source, mtime):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("UPDATE ingest_manifest SET mtime = %s WHERE source = %s", (mtime, source))
+            conn.commit()
+
+    # Deletion, manifest update and checkpoint removal happen in one transaction
+    def finish_source(self, source, removed_hashes, manifest=None):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            if removed_hashes:
+                cur.execute(
+                    "DELETE FROM embeddings WHERE source = %s AND chunk_hash = ANY(%s)",
+                    (source, list(removed_hashes))
+                )
+            if manifest is not None:
+                cur.execute("""
+                    INSERT INTO ingest_manifest (source, content_hash, mtime, chunk_hashes, chunker)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (source) DO UPDATE SET
+                        content_hash = EXCLUDED.content_hash,
+                        mtime = EXCLUDED.mtime,
+                        chunk_hashes = EXCLUDED.chunk_hashes,
+                        chunker = EXCLUDED.chunker,
+                        ingested_at = now();
+                """, (source, manifest["content_hash"], manifest["mtime"],
+                      manifest["chunk_hashes"], manifest["chunker"]))
+                cur.execute("DELETE FROM ingest_checkpoint WHERE source = %s", (source,))
+            conn.commit()
+
+    def get_checkpoint(self, source):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT job_id, content_hash, chunker, chunk_index FROM ingest_checkpoint WHERE source = %s",
+                (source,)
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {"source": source, "job_id": row[0], "content_hash": row[1], "chunker": row[2],
+                "chunk_index": row[3]}
+
+    def maintain(self):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            rebuilt = vector_index.maintain_ann_index(cur, self.dim)
+            conn.commit()
+        return rebuilt
+
+    # Planner row estimate (avoids a full count) plus connection pool counters.
+    # The estimate is -1 (0 before PostgreSQL 14) until the table is first
+    # analyzed, so a freshly ingested table is counted instead.
+    def stats(self):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'embeddings'")
+            row = cur.fetchone()
+            rows = row[0] if row else 0
+            if rows <= 0:
+                cur.execute("SELECT count(*) FROM embeddings")
+                rows = cur.fetchone()[0]
+        pool = db_pool.get_pool_stats()
+        return {
+            "backend": self.backend,
+            "rows": rows,
+            "pool_checkouts": pool["checkouts"],
+            "pool_waits": pool["waits"],
+            "pool_wait_ms": round(pool["wait_time_total"] * 1000, 1),
+            "checkout_avg_ms": round(pool["checkout_time_avg"] * 1000, 2),
+            "checkout_max_ms": round(pool["checkout_time_max"] * 1000, 2),
+            "connections_opened": pool["connections_opened"],
+            "connections_discarded": pool["connections_discarded"],
+        }
+
+    def close(self):
+        db_pool.close_all()
@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import metrics
+from .chunking import approx_token_count
+
+# Candidates fetched from the vector index before reranking
+RETRIEVAL_CANDIDATES = 20
+
+# "vector": nearest neighbours only; "hybrid": also full-text matches (exact part
+# numbers, product names), fused with reciprocal rank fusion. Stores without a
+# full-text index fall back to "vector".
+RETRIEVAL_MODE = "hybrid"
+
+# Reciprocal rank fusion constant: a row scores 1 / (RRF_K + rank) in each list
+RRF_K = 60
+
+# Passages kept after maximal-marginal-relevance reranking
+RETRIEVAL_TOP_K = 6
+
+# 1.0 ranks purely by relevance, lower values favour diverse passages
+MMR_LAMBDA = 0.7
+
+# Candidates at least this similar (cosine) to an already selected passage are dropped
+DUPLICATE_THRESHOLD = 0.95
+
+# Token budget for the retrieved context placed in the prompt
+CONTEXT_TOKEN_BUDGET = 1024
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+# Indices of up to k rows of `vectors` chosen by maximal marginal relevance.
+# Relevance is the cosine similarity to the query unless scores are given.
+def mmr(query_embedding, vectors, k=RETRIEVAL_TOP_K, lambda_mult=MMR_LAMBDA,
+        duplicate_threshold=DUPLICATE_THRESHOLD, scores=None):
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+    if not len(vectors):
+        return []
+
+    relevance = vectors @ query if scores is None else np.asarray(scores, dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    closest = similarity[selected[0]].copy()
+    available = np.ones(len(vectors), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        available &= closest < duplicate_threshold
+        if not available.any():
+            break
+        scores = lambda_mult * relevance - (1 - lambda_mult) * closest
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(closest, similarity[best], out=closest)
+
+    return selected
+
+
+# Keep passages in rank order while they fit the token budget
+def pack_context(passages, token_budget=CONTEXT_TOKEN_BUDGET, count_tokens=approx_token_count):
+    packed, used = [], 0
+    for passage in passages:
+        tokens = count_tokens(passage)
+        if used + tokens > token_budget:
+            continue
+        packed.append(passage)
+        used += tokens
+    return packed
+
+
+# Rerank (text, embedding, distance) candidates with MMR and pack them into the
+# budget; scores (e.g. from fuse()) replace cosine similarity as relevance
+@metrics.timed("rerank")
+def select_context(query_embedding, candidates, k=RETRIEVAL_TOP_K, token_budget=CONTEXT_TOKEN_BUDGET, scores=None):
+    if not candidates:
+        return []
+    order = mmr(query_embedding, [row[1] for row in candidates], k, scores=scores)
+    return pack_context([candidates[index][0] for index in order], token_budget)
+
+
+# Reciprocal rank fusion of ranked candidate lists (rows keyed by their text).
+# Returns (candidates, scores), best first. Fused scores lie close together, so
+# they are scaled to 0..1 to keep them comparable with MMR's similarity penalty.
+def fuse(ranked_lists, k=RRF_K):
+    fused, rows = {}, {}
+    for ranked in ranked_lists:
+        for rank, row in enumerate(ranked, start=1):
+            fused[row[0]] = fused.get(row[0], 0.0) + 1 / (k + rank)
+            rows.setdefault(row[0], row)
+    order = sorted(fused, key=fused.get, reverse=True)
+    if not order:
+        return [], []
+    best, worst = fused[order[0]], fused[order[-1]]
+    spread = best - worst or 1.0
+    return [rows[text] for text in order], [(fused[text] - worst) / spread for text in order]
+
+
+_lexical_executor = None
+
+
+# The lexical leg runs in its own thread (and pooled connection) while the
+# vector leg runs in the caller's thread
+def _lexical_pool():
+    global _lexical_executor
+    if _lexical_executor is None:
+        _lexical_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical")
+    return _lexical_executor
+
+
+def _timed_leg(leg, search, *args):
+    start = time.perf_counter()
+    try:
+        return search(*args)
+    finally:
+        metrics.observe(f"retrieve_{leg}", time.perf_counter() - start)
+
+
+# Candidates for a query: the vector leg alone, or in "hybrid" mode the vector
+# and lexical legs run concurrently and fused. Returns (candidates, scores);
+# scores is None for vector-only results.
+@metrics.timed("retrieve")
+def retrieve_candidates(store, query_embedding, query_text=None, limit=RETRIEVAL_CANDIDATES, mode=None):
+    if (mode or RETRIEVAL_MODE) != "hybrid" or not query_text or not store.full_text:
+        return store.search(query_embedding, limit), None
+
+    lexical = _lexical_pool().submit(_timed_leg, "lexical", store.lexical_search, query_text, limit)
+    vector_rows = _timed_leg("vector", store.search, query_embedding, limit)
+    lexical_rows = lexical.result()
+    if not lexical_rows:
+        metrics.count("lexical_empty_total")
+        return vector_rows, None
+    return fuse([vector_rows, lexical_rows])
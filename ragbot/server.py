@@ -0,0 +1,338 @@
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from . import answer_cache, bulk_ingest, conversation, embedding_cache, metrics
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+
+# Chat turns running against Ollama at once; further turns wait in a queue of
+# at most MAX_QUEUED_TURNS and are rejected with 503 beyond that (or after
+# QUEUE_TIMEOUT_SECONDS of waiting) so a saturated model does not pile up work
+MAX_CONCURRENT_TURNS = 4
+MAX_QUEUED_TURNS = 16
+QUEUE_TIMEOUT_SECONDS = 30
+
+# Sessions idle for longer than this are dropped; only the last turns are kept
+SESSION_TTL_SECONDS = 3600
+MAX_SESSIONS = 1000
+SESSION_HISTORY_TURNS = 50
+
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+            503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# Per-session state: the conversation so far (and the model context carrying
+# it), and a lock so a session's turns run one at a time and in order
+class Session:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.created = self.last_seen = time.time()
+        self.history = []
+        self.conversation = conversation.Conversation() if conversation.USE_CONVERSATION_CONTEXT else None
+        self.lock = asyncio.Lock()
+
+    def to_json(self):
+        return {"session_id": self.id, "created": self.created, "last_seen": self.last_seen,
+                "history": [{"user": user, "bot": bot} for user, bot in self.history],
+                "conversation": self.conversation.stats() if self.conversation else None}
+
+
+# HTTP front end for a RagChat: many sessions served from one event loop,
+# reusing the chat app's retrieval and the async generation pipeline.
+# Endpoints (JSON bodies):
+#   POST   /sessions                 -> {"session_id"}
+#   GET    /sessions/<id>            -> session history
+#   DELETE /sessions/<id>
+#   POST   /chat   {"message", "session_id"?, "stream"?}
+#          -> {"answer", "stats"}, or with "stream": true a text/event-stream of
+#             "token" events followed by one "done" event
+#   POST   /ingest {"path"}          -> ingest stats
+#   GET    /stats, GET /health
+# Chat messages are not written back into the shared vector store here, so one
+# session's messages never show up in another session's context.
+class ChatServer:
+    def __init__(self, chat, max_concurrent=MAX_CONCURRENT_TURNS, max_queued=MAX_QUEUED_TURNS,
+                 queue_timeout=QUEUE_TIMEOUT_SECONDS):
+        self.chat = chat
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.sessions = {}
+        self.pipeline = None
+        # Created in serve_forever: before Python 3.10 asyncio primitives bind to
+        # the event loop current at construction, which is not the one asyncio.run starts
+        self._turns = None
+        self._ingest_lock = None
+        self._stats = {"active_turns": 0, "queued_turns": 0, "turns": 0, "rejected": 0, "requests": 0}
+        self._last_prune = time.time()
+
+    # ---- sessions
+
+    def _prune_sessions(self):
+        now = time.time()
+        if now - self._last_prune < 60 and len(self.sessions) < MAX_SESSIONS:
+            return
+        self._last_prune = now
+        for session_id in [key for key, session in self.sessions.items()
+                           if now - session.last_seen > SESSION_TTL_SECONDS]:
+            del self.sessions[session_id]
+        while len(self.sessions) >= MAX_SESSIONS:
+            oldest = min(self.sessions.values(), key=lambda session: session.last_seen)
+            del self.sessions[oldest.id]
+
+    def _new_session(self):
+        self._prune_sessions()
+        session = Session(uuid.uuid4().hex)
+        self.sessions[session.id] = session
+        return session
+
+    def _get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, f"Unknown session: {session_id}")
+        session.last_seen = time.time()
+        return session
+
+    # ---- chat turns
+
+    # Wait for a free generation slot, or refuse when too many turns are waiting
+    async def _acquire_turn(self):
+        if self._turns.locked() and self._stats["queued_turns"] >= self.max_queued:
+            self._stats["rejected"] += 1
+            metrics.count("server_rejected_total")
+            raise HttpError(503, "Model is busy, try again shortly", {"Retry-After": "1"})
+        self._stats["queued_turns"] += 1
+        try:
+            await asyncio.wait_for(self._turns.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            metrics.count("server_rejected_total")
+            raise HttpError(503, "Timed out waiting for the model", {"Retry-After": "1"})
+        finally:
+            self._stats["queued_turns"] -= 1
+
+    # Answer one message in a session; pass acquired=True when the caller already
+    # holds a generation slot (it is released here either way)
+    async def run_turn(self, session, message, on_token=None, acquired=False):
+        if not acquired:
+            await self._acquire_turn()
+        self._stats["active_turns"] += 1
+        try:
+            async with session.lock:
+                stats = {}
+                answer = await self.pipeline.answer(message, on_token=on_token, stats=stats,
+                                                    conversation=session.conversation)
+                session.history.append((message, answer))
+                del session.history[:-SESSION_HISTORY_TURNS]
+                self._stats["turns"] += 1
+                return answer, stats
+        finally:
+            self._stats["active_turns"] -= 1
+            self._turns.release()
+
+    async def handle_chat(self, body, writer):
+        message = body.get("message")
+        if not isinstance(message, str) or not message.strip():
+            raise HttpError(400, "'message' is required")
+        session = self._get_session(body["session_id"]) if body.get("session_id") else self._new_session()
+
+        if not body.get("stream"):
+            answer, stats = await self.run_turn(session, message)
+            return 200, {"session_id": session.id, "answer": answer, "stats": stats}
+
+        # Server-sent events; each token is flushed (and drained, so a slow client
+        # applies backpressure to the Ollama stream) as soon as it arrives. The slot
+        # is taken before the headers go out so a busy server can still answer 503.
+        await self._acquire_turn()
+        try:
+            await _write_head(writer, 200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                            "Connection": "close", "X-Session-Id": session.id})
+        except BaseException:
+            self._turns.release()
+            raise
+
+        async def send_token(token):
+            writer.write(_sse("token", {"token": token}))
+            await writer.drain()
+
+        try:
+            answer, stats = await self.run_turn(session, message, on_token=send_token, acquired=True)
+            writer.write(_sse("done", {"session_id": session.id, "answer": answer, "stats": stats}))
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as error:
+            # The status line is already sent, so failures go out as an event
+            self.chat.console.print(f"[bold red]Error:[/bold red] streaming chat turn: {error}")
+            status = 502 if isinstance(error, httpx.HTTPError) else getattr(error, "status", 500)
+            writer.write(_sse("error", {"error": str(error), "status": status}))
+        await writer.drain()
+        return None, None
+
+    # ---- ingestion and stats
+
+    async def handle_ingest(self, body):
+        path = body.get("path")
+        if not isinstance(path, str) or not path:
+            raise HttpError(400, "'path' is required")
+        # One ingest at a time; it runs in a worker thread like in the CLI
+        async with self._ingest_lock:
+            stats = await asyncio.to_thread(self.chat.process_path, path)
+        # Same rule as the CLI's exit status; an unchanged file counts as ingested
+        return 200, {"path": path, "ingested": not bulk_ingest.has_errors(stats), "stats": stats}
+
+    async def handle_stats(self):
+        store_stats = await asyncio.to_thread(self.chat.store.stats)
+        return 200, {
+            "server": dict(self._stats, sessions=len(self.sessions)),
+            "vector_store": store_stats,
+            "embedding_cache": embedding_cache.get_default_cache().stats(),
+            "answer_cache": answer_cache.get_default_cache().stats(),
+            "embed_batcher": self.pipeline.batcher.stats() if self.pipeline.batcher else None,
+        }
+
+    # ---- HTTP plumbing
+
+    async def route(self, method, path, body, writer):
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok"}
+        if parts == ["stats"] and method == "GET":
+            return await self.handle_stats()
+        if parts == ["chat"] and method == "POST":
+            return await self.handle_chat(body, writer)
+        if parts == ["ingest"] and method == "POST":
+            return await self.handle_ingest(body)
+        if parts == ["sessions"] and method == "POST":
+            return 201, {"session_id": self._new_session().id}
+        if len(parts) == 2 and parts[0] == "sessions":
+            if method == "GET":
+                return 200, self._get_session(parts[1]).to_json()
+            if method == "DELETE":
+                self.sessions.pop(self._get_session(parts[1]).id)
+                return 200, {"deleted": parts[1]}
+        if parts and parts[0] in ("health", "stats", "chat", "ingest", "sessions"):
+            raise HttpError(405, f"{method} not allowed on {path}")
+        raise HttpError(404, f"Not found: {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, raw_body = request
+                self._stats["requests"] += 1
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    if not isinstance(body, dict):
+                        raise HttpError(400, "Expected a JSON object")
+                    status, payload = await self.route(method, path, body, writer)
+                    extra = {}
+                except json.JSONDecodeError:
+                    status, payload, extra = 400, {"error": "Invalid JSON"}, {}
+                except HttpError as error:
+                    status, payload, extra = error.status, {"error": str(error)}, error.headers
+                except httpx.HTTPError as error:
+                    status, payload, extra = 502, {"error": f"Ollama request failed: {error}"}, {}
+                except Exception as error:
+                    self.chat.console.print(f"[bold red]Error:[/bold red] {method} {path}: {error}")
+                    status, payload, extra = 500, {"error": "Internal server error"}, {}
+
+                if status is None:
+                    # The handler streamed its own response and the connection closes
+                    metrics.count("server_requests_total", status="200")
+                    break
+                metrics.count("server_requests_total", status=str(status))
+                await _write_json(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except HttpError as error:
+            await _write_json(writer, error.status, {"error": str(error)}, False)
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host=SERVER_HOST, port=SERVER_PORT):
+        self._turns = asyncio.Semaphore(self.max_concurrent)
+        self._ingest_lock = asyncio.Lock()
+        async with self.chat.pipeline() as pipeline:
+            pipeline.insert = None
+            self.pipeline = pipeline
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            self.chat.console.print(f"[bold green]Serving on http://{host}:{port}[/bold green]")
+            async with server:
+                await server.serve_forever()
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # Only plain decimal digits; int() alone would also take "-1", "+1" or "1_0"
+    length = headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise HttpError(400, "Invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _write_head(writer, status, headers):
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+
+async def _write_json(writer, status, payload, keep_alive, extra_headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Content-Length": str(len(body)),
+               "Connection": "keep-alive" if keep_alive else "close"}
+    headers.update(extra_headers or {})
+    await _write_head(writer, status, headers)
+    writer.write(body)
+    await writer.drain()
+
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+# Run the HTTP server until interrupted
+def serve(chat, host=SERVER_HOST, port=SERVER_PORT):
+    try:
+        asyncio.run(ChatServer(chat).serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,193 @@
+import asyncio
+import random
+import threading
+import time
+
+from . import metrics
+
+# Keep-alive pool of the shared session: hosts kept, connections per host
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 16
+
+# (connect, read) timeouts in seconds per endpoint. For streamed responses the
+# read timeout is the longest wait between two chunks, not for the whole answer.
+HTTP_TIMEOUTS = {
+    "default": (3.05, 60),
+    "embed": (3.05, 120),
+    "generate": (3.05, 300),
+    "create": (3.05, 1800),
+    "pull": (3.05, 3600),
+    "llamastack": (3.05, 300),
+}
+
+# Idempotent calls are retried up to HTTP_MAX_RETRIES times on connection
+# errors, timeouts and HTTP_RETRY_STATUSES, sleeping a random time up to
+# HTTP_BACKOFF_BASE * 2**attempt (capped at HTTP_BACKOFF_MAX) in between.
+# Other calls are only retried when the connection could not be opened.
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_BASE = 0.25
+HTTP_BACKOFF_MAX = 4.0
+HTTP_RETRY_STATUSES = (429, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def timeout(endpoint):
+    return HTTP_TIMEOUTS.get(endpoint, HTTP_TIMEOUTS["default"])
+
+
+# Full jitter: spreads retries of many clients instead of synchronizing them
+def backoff(attempt, retry_after=None):
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+# The process-wide requests.Session, created on first use (requests is
+# imported here rather than at startup)
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                                      max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _count_retry(endpoint, reason):
+    metrics.count("http_retries_total", endpoint=endpoint, reason=reason)
+
+
+# Send a request through the shared session with the endpoint's timeouts.
+# idempotent defaults to True for GET and False otherwise. Raises
+# requests.RequestException once the retries are used up.
+def request(method, url, endpoint="default", idempotent=None, **kwargs):
+    import requests
+    from urllib3.exceptions import NewConnectionError
+    idempotent = method.upper() == "GET" if idempotent is None else idempotent
+    kwargs.setdefault("timeout", timeout(endpoint))
+    session = get_session()
+    attempt = 0
+    while True:
+        metrics.count("http_requests_total", endpoint=endpoint)
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            # A connection that could not be opened never reached the server
+            reason = getattr(error.args[0], "reason", None) if error.args else None
+            connect_failed = isinstance(error, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+            if not (idempotent or connect_failed) or attempt >= HTTP_MAX_RETRIES:
+                metrics.count("http_errors_total", stage=endpoint)
+                raise
+            _count_retry(endpoint, "connect" if connect_failed else type(error).__name__.lower())
+            time.sleep(backoff(attempt))
+            attempt += 1
+            continue
+
+        if idempotent and response.status_code in HTTP_RETRY_STATUSES and attempt < HTTP_MAX_RETRIES:
+            _count_retry(endpoint, str(response.status_code))
+            response.close()
+            time.sleep(backoff(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+            continue
+        return response
+
+
+def post(url, endpoint="default", idempotent=False, **kwargs):
+    return request("POST", url, endpoint, idempotent, **kwargs)
+
+
+def get(url, endpoint="default", **kwargs):
+    return request("GET", url, endpoint, True, **kwargs)
+
+
+# httpx timeout for an endpoint, e.g. client.post(..., timeout=httpx_timeout("embed"))
+def httpx_timeout(endpoint):
+    import httpx
+    connect, read = timeout(endpoint)
+    return httpx.Timeout(read, connect=connect)
+
+
+# Async client with the same pool size and default timeouts as the shared session
+def async_client():
+    import httpx
+    return httpx.AsyncClient(
+        timeout=httpx_timeout("default"),
+        limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE, max_keepalive_connections=HTTP_POOL_MAXSIZE),
+    )
+
+
+# Async variant of request() for an httpx.AsyncClient (not for streamed responses)
+async def request_async(client, method, url, endpoint="default", idempotent=None, **kwargs):
+    import httpx
+    idempotent = method.upper() == "GET" if idempotent is None else idempotent
+    kwargs.setdefault("timeout", httpx_timeout(endpoint))
+    attempt = 0
+    while True:
+        metrics.count("http_requests_total", endpoint=endpoint)
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as error:
+            connect_failed = isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+            if not (idempotent or connect_failed) or attempt >= HTTP_MAX_RETRIES:
+                metrics.count("http_errors_total", stage=endpoint)
+                raise
+            _count_retry(endpoint, "connect" if connect_failed else type(error).__name__.lower())
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
+            continue
+
+        if idempotent and response.status_code in HTTP_RETRY_STATUSES and attempt < HTTP_MAX_RETRIES:
+            _count_retry(endpoint, str(response.status_code))
+            await asyncio.sleep(backoff(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+            continue
+        return response
+
+
+# Open a streamed response on an httpx.AsyncClient. Only connections that
+# could not be opened are retried: nothing reached the server and no part of
+# the body has been read yet. The caller reads the body and closes the response.
+async def stream_async(client, method, url, endpoint="default", **kwargs):
+    import httpx
+    kwargs.setdefault("timeout", httpx_timeout(endpoint))
+    request = client.build_request(method, url, **kwargs)
+    attempt = 0
+    while True:
+        metrics.count("http_requests_total", endpoint=endpoint)
+        try:
+            return await client.send(request, stream=True)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            if attempt >= HTTP_MAX_RETRIES:
+                metrics.count("http_errors_total", stage=endpoint)
+                raise
+            _count_retry(endpoint, "connect")
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
+
+
+# Requests sent and connections opened by the shared session's pools; every
+# request beyond the connections opened reused a kept-alive connection
+def pool_stats():
+    stats = {"requests": 0, "connections": 0}
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    stats["requests"] += pool.num_requests
+                    stats["connections"] += pool.num_connections
+    requests_sent = stats["requests"]
+    stats["reuse_rate"] = (requests_sent - stats["connections"]) / requests_sent if requests_sent else 0.0
+    return stats
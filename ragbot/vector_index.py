@@ -0,0 +1,184 @@
+import math
+
+# pgvector indexes at most 2000 dimensions as vector and 4000 as halfvec.
+# Larger embeddings (llama3 produces 4096) are indexed through their binary
+# quantization and the candidates are rescored against the full vectors.
+MAX_VECTOR_INDEX_DIM = 2000
+MAX_HALFVEC_INDEX_DIM = 4000
+
+# Index method: "hnsw" (no training, maintained on insert) or "ivfflat"
+ANN_INDEX_METHOD = "hnsw"
+
+# HNSW build and query settings
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+
+# IVFFlat settings; lists is derived from the row count when the index is (re)built
+IVFFLAT_MIN_LISTS = 10
+IVFFLAT_PROBES = 10
+
+# Candidates fetched from the binary index before exact rescoring
+RESCORE_CANDIDATES = 40
+
+# Text search configuration of the lexical (full-text) index; "english" drops
+# stop words and stems. It splits identifiers such as part numbers ("ax-1234"
+# becomes 'ax' and '-1234'), so lexical_candidates matches each query word as a
+# phrase to keep those parts together.
+TEXT_SEARCH_CONFIG = "english"
+
+# Query words beyond this many are left out of the lexical query
+LEXICAL_MAX_TERMS = 32
+
+# Set to "binary" to index the binary quantization (1 bit per dimension) and
+# rescore exactly at any dimension, not only above MAX_HALFVEC_INDEX_DIM;
+# the index is 32x smaller than a vector index, at some cost in recall
+ANN_QUANTIZATION = None
+
+
+def _binary_index(dim):
+    return ANN_QUANTIZATION == "binary" or dim > MAX_HALFVEC_INDEX_DIM
+
+
+# Pick the indexed expression, the matching query cast and the operator class
+def _index_spec(dim):
+    if _binary_index(dim):
+        return f"(binary_quantize(embedding)::bit({dim}))", "binary_quantize(%s::vector)", "<~>", "bit_hamming_ops"
+    if dim <= MAX_VECTOR_INDEX_DIM:
+        return "embedding", "%s::vector", "<->", "vector_l2_ops"
+    return f"(embedding::halfvec({dim}))", f"%s::halfvec({dim})", "<->", "halfvec_l2_ops"
+
+
+# Forced binary indexes get their own name, so switching ANN_QUANTIZATION
+# builds a new index instead of silently reusing the old one
+def _index_name(method):
+    if ANN_QUANTIZATION == "binary":
+        return f"embeddings_{method}_bit_idx"
+    return f"embeddings_{method}_idx"
+
+
+# pgvector's guideline: rows / 1000 lists up to 1M rows, sqrt(rows) beyond
+def _ivfflat_lists(row_count):
+    if row_count <= 1_000_000:
+        return max(IVFFLAT_MIN_LISTS, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def _create_index(cur, dim, method, lists=None):
+    expression, _, _, ops = _index_spec(dim)
+    if method == "hnsw":
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    else:
+        options = f"lists = {lists or IVFFLAT_MIN_LISTS}"
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {_index_name(method)} ON embeddings
+        USING {method} ({expression} {ops}) WITH ({options});
+    """)
+
+
+# Create the embeddings table and its approximate-nearest-neighbour index
+def create_embeddings_table(cur, dim, method=ANN_INDEX_METHOD):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            id SERIAL PRIMARY KEY,
+            text TEXT NOT NULL,
+            embedding vector({dim}) NOT NULL
+        );
+    """)
+    if method == "ivfflat":
+        cur.execute("SELECT count(*) FROM embeddings")
+        _create_index(cur, dim, method, _ivfflat_lists(cur.fetchone()[0]))
+    else:
+        _create_index(cur, dim, method)
+
+
+# Full-text column kept up to date by Postgres on every insert, with its GIN index
+def create_text_search_index(cur, config=TEXT_SEARCH_CONFIG):
+    cur.execute(f"""
+        ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS text_search tsvector
+        GENERATED ALWAYS AS (to_tsvector('{config}', text)) STORED;
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS embeddings_text_search_idx ON embeddings USING gin (text_search)")
+
+
+# Return (text, embedding, rank) for the `limit` rows best matching any word of
+# query_text, highest rank first. Words are ORed (a question rarely contains
+# only words of one passage), but each word is a phrase query, so an identifier
+# like "AX-1234" only matches its parts next to each other, not any passage
+# that mentions "ax".
+def lexical_candidates(cur, query_text, limit=1, config=TEXT_SEARCH_CONFIG):
+    words = query_text.split()[:LEXICAL_MAX_TERMS]
+    if not words:
+        return []
+    query = " || ".join([f"phraseto_tsquery('{config}', %s)"] * len(words))
+    cur.execute(f"""
+        SELECT text, embedding, ts_rank_cd(text_search, q.query) AS rank
+        FROM embeddings, (SELECT {query} AS query) AS q
+        WHERE text_search @@ q.query
+        ORDER BY rank DESC
+        LIMIT %s;
+    """, (*words, limit))
+    return cur.fetchall()
+
+
+# Rebuild an IVFFlat index whose list count no longer fits the table size
+# (HNSW keeps itself up to date on insert, so there is nothing to do for it)
+def maintain_ann_index(cur, dim, method=ANN_INDEX_METHOD):
+    if method != "ivfflat":
+        return False
+
+    cur.execute("SELECT reloptions FROM pg_class WHERE relname = %s", (_index_name(method),))
+    result = cur.fetchone()
+    options = dict(option.split("=", 1) for option in (result[0] or [])) if result else {}
+    current_lists = int(options.get("lists", 0))
+
+    cur.execute("SELECT count(*) FROM embeddings")
+    wanted_lists = _ivfflat_lists(cur.fetchone()[0])
+    if current_lists and current_lists * 2 > wanted_lists and wanted_lists * 2 > current_lists:
+        return False
+
+    cur.execute(f"DROP INDEX IF EXISTS {_index_name(method)}")
+    _create_index(cur, dim, method, wanted_lists)
+    return True
+
+
+# Apply per-query search settings for the current transaction only
+def set_search_params(cur, method=ANN_INDEX_METHOD, ef_search=HNSW_EF_SEARCH, probes=IVFFLAT_PROBES):
+    if method == "hnsw":
+        cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+    else:
+        cur.execute("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),))
+
+
+# Return (text, embedding, distance) for the `limit` nearest rows to query_embedding
+def search_candidates(cur, query_embedding, dim, limit=1, method=ANN_INDEX_METHOD,
+                      ef_search=HNSW_EF_SEARCH, probes=IVFFLAT_PROBES):
+    expression, query_cast, operator, _ = _index_spec(dim)
+
+    if not _binary_index(dim):
+        set_search_params(cur, method, max(ef_search, limit), probes)
+        cur.execute(f"""
+            SELECT text, embedding, {expression} {operator} {query_cast} AS distance
+            FROM embeddings
+            ORDER BY {expression} {operator} {query_cast}
+            LIMIT %s;
+        """, (query_embedding, query_embedding, limit))
+    else:
+        candidates = max(RESCORE_CANDIDATES, limit)
+        set_search_params(cur, method, max(ef_search, candidates), probes)
+        cur.execute(f"""
+            SELECT text, embedding, embedding <-> %s::vector AS distance FROM (
+                SELECT text, embedding FROM embeddings
+                ORDER BY {expression} {operator} {query_cast}
+                LIMIT %s
+            ) candidates
+            ORDER BY distance
+            LIMIT %s;
+        """, (query_embedding, query_embedding, candidates, limit))
+
+    return cur.fetchall()
+
+
+# Return the texts of the `limit` nearest rows to query_embedding
+def search(cur, query_embedding, dim, limit=1, **options):
+    return [row[0] for row in search_candidates(cur, query_embedding, dim, limit, **options)]
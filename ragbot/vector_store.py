@@ -0,0 +1,72 @@
+# Available backends: "pgvector" (PostgreSQL) and "mmap" (embedded, no server)
+VECTOR_STORE_BACKENDS = ("pgvector", "mmap")
+
+
+# Interface shared by the vector store backends. Rows are
+# (text, embedding, source, chunk_hash, location); source and chunk_hash are
+# None for chat messages and set for ingested file chunks, location says where
+# in the source a chunk came from (e.g. "rows 1-40" for CSV files) or is None.
+class VectorStore:
+    backend = None
+    full_text = False   # lexical_search is supported
+
+    # Create tables / files and indexes
+    def setup(self):
+        raise NotImplementedError
+
+    # Append rows. checkpoints are ingest checkpoints ({"source", "job_id",
+    # "content_hash", "chunker", "chunk_index"}) committed together with the rows,
+    # so a checkpoint never gets ahead of the chunks actually stored.
+    def add(self, rows, checkpoints=None):
+        raise NotImplementedError
+
+    # Nearest rows to query_embedding as (text, embedding, distance), closest first
+    def search(self, query_embedding, limit):
+        raise NotImplementedError
+
+    # Rows matching the words of query_text as (text, embedding, rank), best first
+    def lexical_search(self, query_text, limit):
+        raise NotImplementedError
+
+    # Chunk hashes currently stored for a source
+    def chunk_hashes(self, source):
+        raise NotImplementedError
+
+    # Manifest entry for a source: {"content_hash", "mtime", "chunker"} or None
+    def get_manifest(self, source):
+        raise NotImplementedError
+
+    # Record a new mtime for a source whose content did not change
+    def touch_manifest(self, source, mtime):
+        raise NotImplementedError
+
+    # Delete a source's removed chunks and, if given, store its new manifest
+    # entry and drop its checkpoint (the job is complete)
+    def finish_source(self, source, removed_hashes, manifest=None):
+        raise NotImplementedError
+
+    # Checkpoint of an unfinished ingest job for a source, or None
+    def get_checkpoint(self, source):
+        raise NotImplementedError
+
+    # Periodic index upkeep after bulk changes
+    def maintain(self):
+        return False
+
+    # Counters for the 'stats' command
+    def stats(self):
+        return {"backend": self.backend}
+
+    def close(self):
+        pass
+
+
+# Open a backend by name; drivers are imported only for the backend in use
+def open_store(backend, dim, db_config=None, path=None):
+    if backend == "pgvector":
+        from .pg_store import PgVectorStore
+        return PgVectorStore(db_config, dim)
+    if backend == "mmap":
+        from .mmap_store import MmapVectorStore
+        return MmapVectorStore(path, dim)
+    raise ValueError(f"Unknown vector store backend: {backend}")